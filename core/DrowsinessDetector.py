@@ -1,10 +1,6 @@
 import cv2
-import numpy as np
-from ultralytics import YOLO
-from collections import deque
 import time
 import sqlite3
-from datetime import datetime
 from pathlib import Path
 import threading
 import queue
@@ -12,138 +8,449 @@ import os
 import repository.drowsy_video_repo as drowsy_video_repo
 import repository.frame_repo as frame_repo
 import core.config as config
+import core.model_cache as model_cache
+from core.face_roi import FaceRoiCropper
+from core.clip_buffer import ClipRingBuffer
+from core.rolling_stats import DrowsinessStats
+from core.alert_tracker import AlertTracker
+from core.frame_meta import FrameClock
+from core.latency_histogram import StageLatencies
+
+# Sentinel đánh thức các thread worker khi dừng detector
+_STOP = object()
+
+# Chiến lược khi processing_queue đầy
+QUEUE_POLICIES = ('drop_oldest', 'latest_only', 'block')
+
+
+class DynamicBatcher:
+    """Gom frame thành batch: đủ max_batch_size hoặc hết max_wait_ms, tùy điều kiện nào đến trước"""
+
+    def __init__(self, source_queue, max_batch_size=4, max_wait_ms=15.0):
+        """
+        Args:
+            source_queue: queue chứa các frame chờ xử lý
+            max_batch_size: Số frame tối đa trong một batch
+            max_wait_ms: Thời gian chờ tối đa (ms) tính từ frame đầu tiên của batch
+        """
+        self.source_queue = source_queue
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        # Thống kê batch gần nhất
+        self.last_batch_size = 0
+        self.last_wait_ms = 0.0
+        self.last_latency_ms = 0.0
+        self.avg_batch_size = 0.0
+        self.avg_latency_ms = 0.0
+        self.batch_count = 0
+        self._batch_start = None
+
+    def next_batch(self):
+        """
+        Chờ và trả về batch tiếp theo.
+        Returns: list các item, hoặc None khi nhận sentinel dừng
+        """
+        item = self.source_queue.get()
+        if item is _STOP:
+            return None
+
+        self._batch_start = time.perf_counter()
+        deadline = self._batch_start + self.max_wait
+        batch = [item]
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self.source_queue.get(timeout=remaining)
+                else:
+                    item = self.source_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return None
+            batch.append(item)
+
+        self.last_batch_size = len(batch)
+        self.last_wait_ms = (time.perf_counter() - self._batch_start) * 1000
+        return batch
+
+    def batch_done(self):
+        """Ghi nhận batch hiện tại đã xử lý xong, cập nhật độ trễ"""
+        if self._batch_start is None:
+            return
+        self.last_latency_ms = (time.perf_counter() - self._batch_start) * 1000
+        self._batch_start = None
+        self.batch_count += 1
+
+        # Trung bình trượt (EMA) để hiển thị ổn định
+        alpha = 0.1 if self.batch_count > 1 else 1.0
+        self.avg_batch_size += alpha * (self.last_batch_size - self.avg_batch_size)
+        self.avg_latency_ms += alpha * (self.last_latency_ms - self.avg_latency_ms)
+
+    def stats(self):
+        return {
+            'batch_size': self.last_batch_size,
+            'batch_wait_ms': self.last_wait_ms,
+            'batch_latency_ms': self.last_latency_ms,
+            'avg_batch_size': self.avg_batch_size,
+            'avg_batch_latency_ms': self.avg_latency_ms,
+        }
+
+
+class InferenceEngine:
+    """
+    Engine suy luận dùng chung cho một hoặc nhiều luồng camera: một model, một thread xử lý và một
+    processing_queue chung, nên batch được gom từ frame của mọi luồng. Lịch sử, trạng thái cảnh báo,
+    clip buffer và bộ cắt mặt vẫn thuộc từng DrowsinessDetector (luồng).
+    """
+
+    def __init__(self, model_path, batch_size=4, max_batch_wait_ms=None, queue_size=30):
+        """
+        Args:
+            model_path: Đường dẫn đến model YOLO (.pt hoặc .onnx)
+            batch_size: Số frame tối đa trong một batch (gom từ mọi luồng)
+            max_batch_wait_ms: Thời gian chờ tối đa để gom batch, None thì lấy từ config
+            queue_size: Số frame chờ tối đa trong processing_queue
+        """
+        if max_batch_wait_ms is None:
+            max_batch_wait_ms = config.config.get('detector', {}).get('max_batch_wait_ms', 15)
+        self.model_path = model_path
+        # Backend suy luận (ultralytics/ONNX Runtime) chọn theo config.json, lấy từ cache nếu đã nạp
+        self.backend = model_cache.acquire(model_path, config.config.get('inference', {}))
+        self.processing_queue = queue.Queue(maxsize=queue_size)
+        self.batcher = DynamicBatcher(self.processing_queue, batch_size, max_batch_wait_ms)
+
+        self.streams = []
+        self._streams_lock = threading.Lock()
+        # Frame của một luồng có thể bị bỏ bởi thread camera của luồng khác (queue chung) hoặc thread xử lý,
+        # bộ đếm 'evicted' chỉ được tăng khi giữ khóa này
+        self._evicted_lock = threading.Lock()
+        # Lỗi suy luận của batch gần nhất (None khi đang chạy bình thường) và tổng số batch lỗi
+        self.error = None
+        self.error_count = 0
+
+        # Thread xử lý YOLO
+        self.running = True
+        self.thread = threading.Thread(target=self._processing_loop, daemon=True)
+        self.thread.start()
+
+    def attach(self, stream):
+        with self._streams_lock:
+            self.streams.append(stream)
+
+    def detach(self, stream):
+        """Gỡ một luồng, frame còn trong queue của luồng đó sẽ bị bỏ qua"""
+        with self._streams_lock:
+            if stream in self.streams:
+                self.streams.remove(stream)
+
+    def submit(self, stream, meta, frame):
+        """Đưa frame của một luồng vào processing_queue theo queue_policy của luồng đó"""
+        # Kèm thời điểm vào queue để đo thời gian chờ trong queue
+        item = (stream, meta, frame, time.perf_counter())
+        if stream.queue_policy == 'latest_only':
+            # Frame cũ hơn của cùng luồng còn trong queue sẽ bị bỏ khi gom batch
+            stream.latest_submitted_seq = meta.seq
+        elif stream.queue_policy == 'block':
+            try:
+                self.processing_queue.put(item, timeout=stream.block_timeout)
+                stream.frame_counts['enqueued'] += 1
+            except queue.Full:
+                stream.dropped_frames['queue_full'] += 1
+            return
+
+        while True:
+            try:
+                self.processing_queue.put_nowait(item)
+                stream.frame_counts['enqueued'] += 1
+                return
+            except queue.Full:
+                # Nhường chỗ cho frame mới bằng frame cũ nhất (có thể của luồng khác)
+                if not self._evict_oldest():
+                    return
+
+    def _evict_oldest(self):
+        """Bỏ frame cũ nhất trong processing_queue, trả về False nếu gặp sentinel dừng"""
+        try:
+            item = self.processing_queue.get_nowait()
+        except queue.Empty:
+            return True
+        if item is _STOP:
+            self._wake_processing_thread()
+            return False
+        self._count_evicted(item[0])
+        return True
+
+    def _count_evicted(self, stream):
+        with self._evicted_lock:
+            stream.dropped_frames['evicted'] += 1
+
+    def _processing_loop(self):
+        """Luồng riêng xử lý YOLO"""
+        while self.running:
+            # Chờ batch tiếp theo, thoát khi nhận sentinel
+            batch = self.batcher.next_batch()
+            if batch is None or not self.running:
+                break
+
+            now = time.perf_counter()
+            items = []
+            for stream, meta, frame, enqueued_at in batch:
+                if not stream.running:
+                    continue
+                stream.latency.record('queue_wait', (now - enqueued_at) * 1000)
+                # latest_only: đã có frame mới hơn của cùng luồng
+                if stream.queue_policy == 'latest_only' and meta.seq != stream.latest_submitted_seq:
+                    self._count_evicted(stream)
+                    continue
+                # Bỏ các frame đã quá hạn độ tươi, quyết định chỉ dựa trên frame mới
+                if stream.freshness_budget is not None and meta.age(now) > stream.freshness_budget:
+                    stream.dropped_frames['stale'] += 1
+                    continue
+                items.append((stream, meta, frame))
+            if not items:
+                continue
+
+            # Xử lý batch (chỉ phần mặt nếu luồng bật face_roi, ảnh lưu lại vẫn là frame gốc)
+            model_inputs = [stream.face_cropper.crop(frame) if stream.face_cropper else frame
+                            for stream, _, frame in items]
+            inference_start = time.perf_counter()
+            try:
+                predictions = self.backend.predict(model_inputs)
+            except Exception as e:
+                # Bỏ batch lỗi nhưng giữ thread chạy: batch sau backend tự khởi động lại worker (ProcessBackend)
+                self._batch_failed(items, e)
+                continue
+            if self.error is not None:
+                print("✅ Suy luận hoạt động lại")
+                self.error = None
+            inference_ms = (time.perf_counter() - inference_start) * 1000
+            # Mỗi luồng có frame trong batch ghi một lần thời gian suy luận của cả batch
+            for stream in {stream for stream, _, _ in items}:
+                stream.latency.record('inference', inference_ms)
+
+            for (stream, meta, frame), (class_id, class_name, confidence) in zip(items, predictions):
+                postprocess_start = time.perf_counter()
+                stream._handle_result(meta, class_id, class_name, confidence, frame)
+                stream.latency.record_since('postprocess', postprocess_start)
+
+            self.batcher.batch_done()
+
+    def _batch_failed(self, items, error):
+        """Ghi nhận batch suy luận lỗi: frame của batch tính là bị bỏ, lỗi được hiển thị qua status"""
+        self.error_count += 1
+        if self.error is None:
+            print(f"❌ Lỗi suy luận: {error}")
+        self.error = str(error) or type(error).__name__
+        for stream, _, _ in items:
+            stream.dropped_frames['inference_error'] += 1
+
+    @property
+    def can_restart(self):
+        return hasattr(self.backend, 'restart')
+
+    @property
+    def restart_count(self):
+        """Số lần process suy luận đã được khởi động lại (tự động hoặc từ giao diện)"""
+        return getattr(self.backend, 'restart_count', 0)
+
+    def restart(self):
+        """Khởi động lại engine suy luận (chỉ áp dụng khi chạy trong process riêng), thread xử lý vẫn chạy"""
+        if self.can_restart:
+            self.backend.restart()
+            return True
+        return False
+
+    def _wake_processing_thread(self):
+        """Đưa sentinel vào processing_queue để thread xử lý thoát khỏi get()"""
+        while True:
+            try:
+                self.processing_queue.put_nowait(_STOP)
+                return
+            except queue.Full:
+                try:
+                    self.processing_queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def stop(self):
+        """Dừng thread xử lý và trả model về cache (model không bị giải phóng để lần sau dùng lại)"""
+        self.running = False
+        self._wake_processing_thread()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
+        model_cache.release(self.backend)
 
 
 class DrowsinessDetector:
     def __init__(self, model_path, batch_size=4, alert_threshold=3, callback=None, **kwargs):
         """
         Args:
-            model_path: Đường dẫn đến model YOLO
-            batch_size: Số frame xử lý cùng lúc
+            model_path: Đường dẫn đến model YOLO (.pt hoặc .onnx)
+            batch_size: Số frame tối đa xử lý cùng lúc
             alert_threshold: Thời gian liên tục buồn ngủ (giây) trước khi cảnh báo
             callback: Hàm callback khi có cảnh báo (callback_func(frame, drowsy_ratio, avg_conf))
+            max_batch_wait_ms: (kwargs) Thời gian chờ tối đa để gom batch, mặc định lấy từ config
+            freshness_budget_ms, queue_policy, block_timeout_ms: (kwargs) ghi đè mục detector trong config
+            save_alert_clips: (kwargs) False để không lưu ảnh cảnh báo (benchmark, phân tích offline)
+            engine: (kwargs) InferenceEngine dùng chung giữa nhiều camera, None thì tạo engine riêng
+            stream_name: (kwargs) Tên luồng camera khi chạy nhiều camera (thêm vào tên thư mục ảnh cảnh báo)
         """
-        self.model = YOLO(model_path)
+        detector_config = config.config.get('detector', {})
+        # Engine suy luận: dùng chung khi nhiều camera, tự tạo (và tự dừng) khi chỉ một camera
+        self.owns_engine = kwargs.get('engine') is None
+        self.engine = kwargs.get('engine') or InferenceEngine(
+            model_path, batch_size, kwargs.get('max_batch_wait_ms', detector_config.get('max_batch_wait_ms', 15)))
+        self.backend = self.engine.backend
+        self.batcher = self.engine.batcher
+        self.processing_queue = self.engine.processing_queue
+        self.stream_name = kwargs.get('stream_name')
+
+        # Cắt vùng mặt trước khi phân loại (tùy chọn)
+        face_roi_config = config.config.get('face_roi', {})
+        self.face_cropper = FaceRoiCropper(**face_roi_config) if face_roi_config.get('enabled') else None
         self.batch_size = batch_size
         self.alert_threshold = alert_threshold
         self.callback = callback
 
         # Lưu trữ kết quả phân loại gần đây
-        self.drowsy_history = deque(maxlen=int(30 * alert_threshold))
-        self.confidence_history = deque(maxlen=int(30 * alert_threshold))
+        # Thống kê trượt O(1): tỷ lệ buồn ngủ, confidence trung bình và các cửa sổ 1s/3s/10s
+        self.stats = DrowsinessStats(window_size=int(30 * alert_threshold))
 
         self.alert_active = False
-        self.alert_start_time = None
-        self.last_alert_time = 0
-        self.alert_cooldown = 3
+        # Luật cảnh báo (dùng chung với phân tích video offline)
+        self.alert_tracker = AlertTracker(alert_threshold=alert_threshold, cooldown=3)
 
         # Trạng thái hiện tại
         self.current_class = "Unknown"
         self.current_confidence = 0.0
         self.drowsy_ratio = 0.0
 
-        self.processing_queue = queue.Queue(maxsize=30)
         self.result_queue = queue.Queue(maxsize=30)
-        self.frame_queue = queue.Queue(maxsize=90)
-        self.is_save_img = False
+        # Lịch sử frame cho video cảnh báo, cấp phát sẵn và ghi đè tại chỗ
+        self.clip_buffer = ClipRingBuffer(capacity=90)
+
+        # Chính sách độ tươi của frame: bỏ frame quá cũ trước khi suy luận
+        freshness_budget_ms = kwargs.get('freshness_budget_ms', detector_config.get('freshness_budget_ms', 150))
+        self.freshness_budget = freshness_budget_ms / 1000.0 if freshness_budget_ms else None
+        self.queue_policy = kwargs.get('queue_policy', detector_config.get('queue_policy', 'drop_oldest'))
+        if self.queue_policy not in QUEUE_POLICIES:
+            raise ValueError(f"queue_policy không hợp lệ: {self.queue_policy} (hỗ trợ: {', '.join(QUEUE_POLICIES)})")
+        # None: chờ đến khi có chỗ (không bỏ frame), dùng khi đo tốc độ hoặc phân tích offline
+        block_timeout_ms = kwargs.get('block_timeout_ms', detector_config.get('block_timeout_ms', 100))
+        self.block_timeout = block_timeout_ms / 1000.0 if block_timeout_ms is not None else None
+        # Số frame bị bỏ theo lý do (result_overflow: đã suy luận nhưng result_queue đầy nên mất kết quả,
+        # inference_error: batch chứa frame bị lỗi khi suy luận). Mỗi khóa chỉ được tăng từ một thread, riêng
+        # 'evicted' được tăng từ nhiều thread (camera của mọi luồng dùng chung engine) dưới khóa của engine
+        self.dropped_frames = {'stale': 0, 'evicted': 0, 'queue_full': 0, 'result_overflow': 0, 'inference_error': 0}
+        # Bộ đếm frame (mỗi khóa chỉ được tăng từ một thread nên không cần khóa)
+        self.frame_counts = {'captured': 0, 'enqueued': 0, 'inferred': 0}
+        self.alert_count = 0
+        self.started_at = time.perf_counter()
+        # Histogram độ trễ từng giai đoạn (camera, queue, suy luận, hiển thị, overlay trên GUI...) của luồng này
+        self.latency = StageLatencies()
+        self.latest_submitted_seq = None
+        # Thread lưu ảnh chờ trên event thay vì thức dậy mỗi giây để kiểm tra
+        self.save_img_event = threading.Event()
         self.current_frame_id = None
         self.last_frame_id = None
+        # Số thứ tự và độ trễ (capture -> có kết quả) của frame mới nhất đã phân loại
+        self.current_frame_seq = None
+        self.frame_latency = 0.0
+        # Dùng khi process_frame được gọi không kèm FrameMeta
+        self.frame_clock = FrameClock()
         self.session_id = kwargs.get("session_id")
+        # False: không lưu ảnh/video cảnh báo vào drowsy_images và database
+        self.save_alert_clips = kwargs.get('save_alert_clips', True)
 
         # self._init_database()
         self.drowsy_path = config.config.get('drowsy_image_path', 'drowsy_images')
         Path(self.drowsy_path).mkdir(exist_ok=True)
 
-        # Thread xử lý YOLO
+        # Nhận kết quả từ engine (thread xử lý YOLO nằm trong engine)
         self.running = True
-        self.thread = threading.Thread(target=self._processing_loop, daemon=True)
-        self.thread.start()
+        self.engine.attach(self)
         # Thread lưu ảnh
         self.img_thread = threading.Thread(target=self._save_img, daemon=True)
         self.img_thread.start()
 
-    def _save_img(self):
-        """Lưu ảnh cảnh báo"""
-        while self.running:
-            time.sleep(1)
-            if self.is_save_img:
-                timestamp = self.current_frame_id
-                last_id = self.last_frame_id
-                video_frame_id = f"{self.drowsy_path}/drowsy_{timestamp}_sessionID={self.session_id}"
-                os.makedirs(video_frame_id, exist_ok=True)
-                drowsyVideoID = drowsy_video_repo.create_drowsy_video(self.session_id, last_id, timestamp)
-                for i, (idx, _, confidence, class_name, frame) in enumerate(list(self.frame_queue.queue.copy())):
-                    url_img = f"{video_frame_id}/frame_idx={idx}_{i}_confidence={confidence}_class={class_name}.jpg"
-                    cv2.imwrite(url_img, frame)
-                    frame_repo.insert_frame(drowsyVideoID, confidence, class_name.lower() == 'drowsy', url_img)
-                self.is_save_img = False
-
-    def _processing_loop(self):
-        """Luồng riêng xử lý YOLO"""
-        while self.running:
-            frames = []
-            frame_indices = []
-
-            # Thu thập batch frames
-            while len(frames) < self.batch_size and not self.processing_queue.empty():
-                try:
-                    idx, frame = self.processing_queue.get(timeout=0.01)
-                    frames.append(frame)
-                    frame_indices.append(idx)
-                except queue.Empty:
-                    break
-
-            if not frames:
-                time.sleep(0.01)
-                continue
-
-            # Xử lý batch
-            results = self.model(frames, verbose=False)
+    @property
+    def is_save_img(self):
+        return self.save_img_event.is_set()
 
-            for idx, result in zip(frame_indices, results):
-                # Lấy class và confidence
-                class_id = result.probs.top1
-                class_name = result.names[class_id]
-                confidence = result.probs.top1conf.item()
+    @is_save_img.setter
+    def is_save_img(self, value):
+        if value:
+            self.save_img_event.set()
+        else:
+            self.save_img_event.clear()
 
-                # Kiểm tra nếu là Drowsy
-                is_drowsy = class_name.lower() == 'drowsy'
+    def _save_img(self):
+        """Lưu ảnh cảnh báo"""
+        while True:
+            # Chờ đến khi có yêu cầu lưu ảnh hoặc detector dừng
+            self.save_img_event.wait()
+            if not self.running:
+                break
+            # Xóa cờ trước khi ghi để yêu cầu dừng trong lúc ghi ảnh không bị mất
+            self.save_img_event.clear()
+            timestamp = self.current_frame_id
+            last_id = self.last_frame_id
+            video_frame_id = f"{self.drowsy_path}/drowsy_{timestamp}_sessionID={self.session_id}"
+            if self.stream_name:
+                # Nhiều camera có thể cảnh báo trong cùng một giây
+                video_frame_id += f"_stream={self.stream_name}"
+            os.makedirs(video_frame_id, exist_ok=True)
+            drowsyVideoID = drowsy_video_repo.create_drowsy_video(self.session_id, last_id, timestamp)
+            frame_metas, confidences, class_ids, frames = self.clip_buffer.snapshot()
+            for i in range(len(frame_metas)):
+                meta, confidence = frame_metas[i], float(confidences[i])
+                class_name = self.backend.names.get(int(class_ids[i]), str(class_ids[i]))
+                url_img = (f"{video_frame_id}/frame_idx={meta.seq}_ts={meta.wall_time:.3f}"
+                           f"_confidence={confidence}_class={class_name}.jpg")
+                cv2.imwrite(url_img, frames[i])
+                frame_repo.insert_frame(drowsyVideoID, confidence, class_name.lower() == 'drowsy', url_img,
+                                        frame_seq=meta.seq, capture_time=meta.wall_time)
+
+    def _handle_result(self, meta, class_id, class_name, confidence, frame):
+        """Engine gọi (từ thread xử lý YOLO) khi có kết quả cho một frame của luồng này"""
+        self.frame_counts['inferred'] += 1
+        # Kiểm tra nếu là Drowsy
+        is_drowsy = class_name.lower() == 'drowsy'
+
+        # Ghi vào lịch sử video cảnh báo, giữ lại id của frame bị ghi đè
+        evicted_meta = self.clip_buffer.write(meta, confidence, class_id, frame)
+        if evicted_meta is not None:
+            self.last_frame_id = evicted_meta.timestamp_id
+
+        # Đưa kết quả vào result_queue
+        try:
+            self.result_queue.put_nowait((meta, is_drowsy, confidence, class_name, frame))
+        except queue.Full:
+            self.dropped_frames['result_overflow'] += 1
 
-                # Đưa kết quả vào result_queue
-                try:
-                    self.result_queue.put_nowait((idx, is_drowsy, confidence, class_name, result.orig_img))
-                    if self.frame_queue.full():
-                        self.last_frame_id = self.frame_queue.get_nowait()[0]
-                    self.frame_queue.put_nowait((idx, is_drowsy, confidence, class_name, result.orig_img.copy()))
-                except queue.Full:
-                    self.frame_queue.get_nowait()
-
-    def process_frame(self, frame):
+    def process_frame(self, frame, meta=None):
         """
         Xử lý một frame
-        Returns: (processed_frame, status_dict)
+        Args:
+            frame: frame BGR từ camera. Detector không sửa frame và giữ tham chiếu cho đến khi suy luận xong,
+                   bên gọi không được ghi đè lên frame sau khi gửi (mỗi lần đọc camera là một mảng mới)
+            meta: FrameMeta gắn lúc đọc frame (số thứ tự + timestamp), None thì tự gắn
+        Returns: (frame, status_dict), frame gốc không vẽ overlay (overlay do GUI vẽ từ status_dict)
         """
-        # Gửi frame vào queue xử lý
-        id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        if not self.processing_queue.full():
-            try:
-                self.processing_queue.put_nowait((id, frame.copy()))
-            except queue.Full:
-                pass
+        if meta is None:
+            meta = self.frame_clock.tag()
+        self.frame_counts['captured'] += 1
+
+        # Gửi frame vào queue xử lý (không copy)
+        self._enqueue_frame(meta, frame)
         # Nhận kết quả từ queue
-        try:
-            while not self.result_queue.empty():
-                idx, is_drowsy, confidence, class_name, _ = self.result_queue.get_nowait()
-                self._update_drowsy_state(idx, is_drowsy, confidence, class_name, frame)
-        except queue.Empty:
-            pass
+        self.poll_results(frame)
 
         # Tính toán các thông số
-        self.drowsy_ratio = sum(self.drowsy_history) / len(self.drowsy_history) if self.drowsy_history else 0
-        avg_conf = np.mean(list(self.confidence_history)) if self.confidence_history else 0
-
-        # Vẽ overlay
-        frame_display = self._draw_overlay(frame.copy(), self.drowsy_ratio, avg_conf)
+        self.drowsy_ratio = self.stats.drowsy_ratio
 
         # Trả về frame và status
         status = {
@@ -151,43 +458,83 @@ class DrowsinessDetector:
             'confidence': self.current_confidence,
             'drowsy_ratio': self.drowsy_ratio,
             'alert_active': self.alert_active,
-            'alert_progress': self._get_alert_progress()
+            'alert_progress': self._get_alert_progress(),
+            'drowsy_ema': self.stats.drowsy_ema,
+            'windows': self.stats.windows(),
+            'frame_seq': meta.seq,
+            'result_seq': self.current_frame_seq,
+            'frame_latency_ms': self.frame_latency * 1000,
+            'dropped_frames': dict(self.dropped_frames),
+            'inference_error': self.engine.error,
+            'inference_restarts': self.engine.restart_count,
+            **self.batcher.stats()
+        }
+
+        return frame, status
+
+    def metrics(self):
+        """
+        Snapshot các bộ đếm của luồng: frame nhận/đưa vào queue/đã suy luận, frame bỏ theo lý do,
+        số batch (của cả engine, dùng chung khi nhiều camera), độ sâu các queue và số kết quả chưa xử lý.
+        Không thay đổi trạng thái nên gọi từ nhiều nơi được; FPS do bên đọc tự tính từ chênh lệch giữa hai lần gọi
+        """
+        now = time.perf_counter()
+        inferred = self.frame_counts['inferred']
+        dropped = dict(self.dropped_frames)
+        return {
+            'stream': self.stream_name,
+            'uptime_s': now - self.started_at,
+            'frames_captured': self.frame_counts['captured'],
+            'frames_enqueued': self.frame_counts['enqueued'],
+            'frames_inferred': inferred,
+            'dropped_frames': dropped,
+            'dropped_total': sum(dropped.values()),
+            'batches': self.batcher.batch_count,
+            'avg_batch_size': self.batcher.avg_batch_size,
+            'processing_queue_depth': self.processing_queue.qsize(),
+            'processing_queue_capacity': self.processing_queue.maxsize,
+            'result_backlog': self.result_queue.qsize(),
+            'frame_latency_ms': self.frame_latency * 1000,
+            'alerts': self.alert_count,
         }
 
-        return frame_display, status
+    def poll_results(self, frame=None):
+        """
+        Lấy hết kết quả đã có trong result_queue và cập nhật trạng thái buồn ngủ
+        Args:
+            frame: frame gửi kèm callback cảnh báo, None thì dùng frame của kết quả
+        Returns: số kết quả đã lấy
+        """
+        count = 0
+        try:
+            while not self.result_queue.empty():
+                result_meta, is_drowsy, confidence, class_name, result_frame = self.result_queue.get_nowait()
+                self._update_drowsy_state(result_meta, is_drowsy, confidence, class_name,
+                                          result_frame if frame is None else frame)
+                count += 1
+        except queue.Empty:
+            pass
+        return count
+
+    def _enqueue_frame(self, meta, frame):
+        """Đưa frame vào processing_queue của engine theo queue_policy"""
+        self.engine.submit(self, meta, frame)
 
-    def _update_drowsy_state(self, idx, is_drowsy, confidence, class_name, frame):
+    def _update_drowsy_state(self, meta, is_drowsy, confidence, class_name, frame):
         """Cập nhật trạng thái buồn ngủ"""
+        self.current_frame_seq = meta.seq
+        self.frame_latency = meta.age()
         self.current_class = class_name
         self.current_confidence = confidence
-        self.drowsy_history.append(int(is_drowsy))
-        self.confidence_history.append(confidence)
-
-        # Tính tỷ lệ drowsy trong lịch sử gần đây
-        if len(self.drowsy_history) >= 30:
-            drowsy_ratio = sum(self.drowsy_history) / len(self.drowsy_history)
-            avg_conf = np.mean(list(self.confidence_history))
-
-            current_time = time.time()
-
-            # Kiểm tra điều kiện cảnh báo
-            if drowsy_ratio > 0.7 and not self.alert_active:
-                if self.alert_start_time is None:
-                    self.alert_start_time = current_time
-
-                # Nếu đã buồn ngủ liên tục đủ lâu
-                elapsed = current_time - self.alert_start_time
-                if elapsed >= self.alert_threshold:
-                    # Kiểm tra cooldown
-                    if current_time - self.last_alert_time > self.alert_cooldown:
-                        self.current_frame_id = idx
-                        self.is_save_img = True
-                        self._trigger_alert(frame, drowsy_ratio, avg_conf)
-                        self.last_alert_time = current_time
-            else:
-                # Reset nếu không còn buồn ngủ
-                if drowsy_ratio <= 0.5:
-                    self.alert_start_time = None
+        self.stats.add(is_drowsy, confidence)
+
+        # Kiểm tra điều kiện cảnh báo trên tỷ lệ drowsy trong lịch sử gần đây
+        if self.alert_tracker.check(self.stats, time.time()):
+            self.alert_count += 1
+            self.current_frame_id = meta.timestamp_id
+            if self.save_alert_clips:
+                self.is_save_img = True
+            self._trigger_alert(frame, self.stats.drowsy_ratio, self.stats.avg_confidence)
 
     def _trigger_alert(self, frame, drowsy_ratio, avg_conf):
         """Kích hoạt cảnh báo"""
@@ -198,49 +545,15 @@ class DrowsinessDetector:
 
         # Reset trạng thái sau 2 giây
         def reset_alert():
-            time.sleep(2)
             self.alert_active = False
 
-        threading.Thread(target=reset_alert, daemon=True).start()
+        timer = threading.Timer(2, reset_alert)
+        timer.daemon = True
+        timer.start()
 
     def _get_alert_progress(self):
         """Lấy tiến trình cảnh báo (0-1)"""
-        if self.alert_start_time is None:
-            return 0.0
-        elapsed = time.time() - self.alert_start_time
-        return min(elapsed / self.alert_threshold, 1.0)
-
-    def _draw_overlay(self, frame, drowsy_ratio, avg_conf):
-        """Vẽ overlay lên frame"""
-        # Background cho text
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (400, 150), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
-
-        # Trạng thái hiện tại
-        status_text = "DROWSY ⚠️" if self.alert_active else self.current_class
-        status_color = (0, 0, 255) if self.alert_active else (0, 255, 0)
-
-        cv2.putText(frame, f"Status: {status_text}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, status_color, 2)
-
-        # Confidence
-        cv2.putText(frame, f"Confidence: {self.current_confidence * 100:.1f}%", (10, 60),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-        # Drowsy ratio
-        ratio_color = (0, 0, 255) if drowsy_ratio > 0.7 else (0, 165, 255) if drowsy_ratio > 0.3 else (0, 255, 0)
-        cv2.putText(frame, f"Drowsy Ratio: {drowsy_ratio * 100:.1f}%", (10, 90),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, ratio_color, 2)
-
-        # Progress bar
-        progress = self._get_alert_progress()
-        if progress > 0:
-            bar_width = int(380 * progress)
-            cv2.rectangle(frame, (10, 110), (10 + bar_width, 130), (0, 140, 255), -1)
-            cv2.rectangle(frame, (10, 110), (390, 130), (255, 255, 255), 2)
-
-        return frame
+        return self.alert_tracker.progress(time.time())
 
     def get_latest_alerts(self, limit=50):
         """Lấy danh sách cảnh báo gần nhất từ database"""
@@ -257,11 +570,17 @@ class DrowsinessDetector:
         """Cập nhật xác nhận cảnh báo"""
         drowsy_video_repo.update_user_choice_by_start_time(timestamp, confirmed)
 
+    def restart_inference(self):
+        """Khởi động lại engine suy luận (chỉ áp dụng khi chạy trong process riêng)"""
+        return self.engine.restart()
+
     def stop(self):
-        """Dừng detector"""
+        """Dừng detector (engine dùng chung chỉ dừng khi detector tự tạo nó)"""
         self.running = False
-        if self.thread.is_alive():
-            self.thread.join(timeout=2)
+        self.engine.detach(self)
+        if self.owns_engine:
+            self.engine.stop()
+        self.save_img_event.set()
         if self.img_thread.is_alive():
             self.img_thread.join(timeout=2)
         # self.conn.close()
@@ -0,0 +1,51 @@
+class AlertTracker:
+    """
+    Luật cảnh báo buồn ngủ dùng chung cho detector realtime và phân tích video offline:
+    tỷ lệ buồn ngủ > trigger_ratio liên tục đủ alert_threshold giây thì cảnh báo (cách nhau ít nhất
+    cooldown giây), tỷ lệ <= reset_ratio thì bắt đầu đếm lại.
+    Thời gian do bên gọi truyền vào (time.time() khi chạy realtime, giây trong video khi offline).
+    """
+
+    def __init__(self, alert_threshold=3, cooldown=3, min_samples=30, trigger_ratio=0.7, reset_ratio=0.5):
+        self.alert_threshold = alert_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.trigger_ratio = trigger_ratio
+        self.reset_ratio = reset_ratio
+
+        self.alert_start_time = None  # thời điểm tỷ lệ buồn ngủ bắt đầu vượt ngưỡng
+        self.last_alert_time = float('-inf')
+
+    def check(self, stats, now):
+        """
+        Cập nhật trạng thái theo thống kê mới nhất
+        Args:
+            stats: DrowsinessStats đã cộng kết quả của frame hiện tại
+            now: thời điểm hiện tại (giây)
+        Returns: True nếu cần phát cảnh báo
+        """
+        if len(stats) < self.min_samples:
+            return False
+
+        drowsy_ratio = stats.drowsy_ratio
+        if drowsy_ratio > self.trigger_ratio:
+            if self.alert_start_time is None:
+                self.alert_start_time = now
+
+            # Buồn ngủ liên tục đủ lâu và đã qua cooldown
+            if now - self.alert_start_time >= self.alert_threshold and now - self.last_alert_time > self.cooldown:
+                self.last_alert_time = now
+                return True
+        elif drowsy_ratio <= self.reset_ratio:
+            self.alert_start_time = None
+        return False
+
+    def progress(self, now):
+        """Tiến trình cảnh báo (0-1)"""
+        if self.alert_start_time is None:
+            return 0.0
+        return min((now - self.alert_start_time) / self.alert_threshold, 1.0)
+
+    def reset(self):
+        self.alert_start_time = None
+        self.last_alert_time = float('-inf')
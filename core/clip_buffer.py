@@ -0,0 +1,85 @@
+import threading
+
+import numpy as np
+
+
+class ClipRingBuffer:
+    """
+    Ring buffer cấp phát sẵn lưu lịch sử frame cho video cảnh báo.
+    Frame được ghi đè tại chỗ vào mảng (N, H, W, 3) uint8, kèm các mảng song song
+    cho FrameMeta (số thứ tự + timestamp), confidence và class id.
+    """
+
+    def __init__(self, capacity=90):
+        self.capacity = int(capacity)
+        self.frames = None
+        self.frame_metas = np.empty(self.capacity, dtype=object)
+        self.confidences = np.zeros(self.capacity, dtype=np.float64)
+        self.class_ids = np.zeros(self.capacity, dtype=np.int16)
+
+        self.head = 0  # vị trí ghi tiếp theo
+        self.count = 0
+        self._lock = threading.Lock()
+
+        # Bộ đệm snapshot dùng lại giữa các lần lưu
+        self._snapshot_frames = None
+        self._snapshot_metas = np.empty(self.capacity, dtype=object)
+        self._snapshot_confidences = np.zeros(self.capacity, dtype=np.float64)
+        self._snapshot_class_ids = np.zeros(self.capacity, dtype=np.int16)
+
+    def _allocate(self, shape):
+        self.frames = np.zeros((self.capacity, *shape), dtype=np.uint8)
+        self.head = 0
+        self.count = 0
+
+    def write(self, meta, confidence, class_id, frame):
+        """
+        Ghi một frame vào ring (copy tại chỗ, không cấp phát mới)
+        Returns: FrameMeta bị ghi đè (frame cũ nhất) hoặc None nếu ring chưa đầy
+        """
+        with self._lock:
+            if self.frames is None or self.frames.shape[1:] != frame.shape:
+                # Cấp phát lần đầu hoặc khi độ phân giải camera thay đổi
+                self._allocate(frame.shape)
+
+            evicted_meta = self.frame_metas[self.head] if self.count == self.capacity else None
+            np.copyto(self.frames[self.head], frame)
+            self.frame_metas[self.head] = meta
+            self.confidences[self.head] = confidence
+            self.class_ids[self.head] = class_id
+
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            return evicted_meta
+
+    def __len__(self):
+        return self.count
+
+    def snapshot(self):
+        """
+        Chụp lại nội dung ring theo thứ tự cũ -> mới vào bộ đệm snapshot dùng lại.
+        Kết quả chỉ hợp lệ đến lần snapshot kế tiếp.
+        Returns: (frame_metas, confidences, class_ids, frames)
+        """
+        with self._lock:
+            n = self.count
+            if n == 0:
+                return (self._snapshot_metas[:0], self._snapshot_confidences[:0],
+                        self._snapshot_class_ids[:0], np.empty((0,), dtype=np.uint8))
+
+            if self._snapshot_frames is None or self._snapshot_frames.shape != self.frames.shape:
+                self._snapshot_frames = np.empty_like(self.frames)
+
+            start = (self.head - n) % self.capacity
+            first = min(n, self.capacity - start)
+            # Tối đa 2 đoạn liên tục do ring quay vòng
+            for src, dst in ((self.frames, self._snapshot_frames),
+                             (self.frame_metas, self._snapshot_metas),
+                             (self.confidences, self._snapshot_confidences),
+                             (self.class_ids, self._snapshot_class_ids)):
+                dst[:first] = src[start:start + first]
+                if first < n:
+                    dst[first:n] = src[:n - first]
+
+            return (self._snapshot_metas[:n], self._snapshot_confidences[:n],
+                    self._snapshot_class_ids[:n], self._snapshot_frames[:n])
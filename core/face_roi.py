@@ -0,0 +1,136 @@
+import cv2
+
+
+class FaceRoiCropper:
+    """
+    Cắt vùng mặt tài xế trước khi đưa vào model phân loại.
+    Dùng Haar cascade để phát hiện mặt, sau đó bám theo bằng template matching
+    và chỉ phát hiện lại khi độ tin cậy bám theo giảm hoặc sau redetect_interval frame.
+    """
+
+    def __init__(self, crop_size=224, redetect_interval=15, min_track_score=0.6, margin=0.25,
+                 detect_scale=0.5, **kwargs):
+        """
+        Args:
+            crop_size: Kích thước (vuông) của ảnh mặt đưa vào model
+            redetect_interval: Số frame tối đa giữa 2 lần chạy lại bộ phát hiện mặt
+            min_track_score: Điểm template matching tối thiểu để tiếp tục bám theo
+            margin: Tỷ lệ mở rộng khung mặt (để giữ trán, cằm)
+            detect_scale: Tỷ lệ thu nhỏ ảnh khi phát hiện/bám theo
+        """
+        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self.detector = cv2.CascadeClassifier(cascade_path)
+        if self.detector.empty():
+            raise RuntimeError(f"Không tải được Haar cascade: {cascade_path}")
+
+        self.crop_size = int(crop_size)
+        self.redetect_interval = int(redetect_interval)
+        self.min_track_score = float(min_track_score)
+        self.margin = float(margin)
+        self.detect_scale = float(detect_scale)
+
+        # Khung mặt (x, y, w, h) trên ảnh thu nhỏ và template dùng để bám theo
+        self.box = None
+        self.template = None
+        self.track_score = 0.0
+        self.frames_since_detect = 0
+
+        # Thống kê
+        self.detect_count = 0
+        self.track_count = 0
+        self.miss_count = 0
+
+    def reset(self):
+        self.box = None
+        self.template = None
+        self.track_score = 0.0
+        self.frames_since_detect = 0
+
+    def _detect(self, gray):
+        h, w = gray.shape[:2]
+        min_side = max(24, min(h, w) // 6)
+        faces = self.detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5,
+                                               minSize=(min_side, min_side))
+        self.detect_count += 1
+        self.frames_since_detect = 0
+        if len(faces) == 0:
+            return None
+        # Lấy mặt lớn nhất (gần camera nhất là tài xế)
+        x, y, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        return int(x), int(y), int(fw), int(fh)
+
+    def _track(self, gray):
+        x, y, w, h = self.box
+        # Vùng tìm kiếm quanh vị trí cũ
+        pad_x, pad_y = w // 2, h // 2
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(gray.shape[1], x + w + pad_x), min(gray.shape[0], y + h + pad_y)
+        search = gray[y0:y1, x0:x1]
+        if search.shape[0] < h or search.shape[1] < w:
+            return None
+
+        result = cv2.matchTemplate(search, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(result)
+        self.track_score = float(score)
+        if score < self.min_track_score:
+            return None
+        self.track_count += 1
+        return x0 + dx, y0 + dy, w, h
+
+    def locate(self, frame):
+        """
+        Tìm khung mặt trên frame gốc
+        Returns: (x, y, w, h) theo tọa độ frame gốc hoặc None
+        """
+        small = cv2.resize(frame, None, fx=self.detect_scale, fy=self.detect_scale,
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        box = None
+        self.frames_since_detect += 1
+        if self.box is not None and self.frames_since_detect < self.redetect_interval:
+            box = self._track(gray)
+        if box is None:
+            box = self._detect(gray)
+            self.track_score = 1.0 if box is not None else 0.0
+
+        if box is None:
+            self.miss_count += 1
+            self.reset()
+            return None
+
+        x, y, w, h = box
+        self.box = box
+        self.template = gray[y:y + h, x:x + w].copy()
+
+        scale = 1.0 / self.detect_scale
+        return int(x * scale), int(y * scale), int(w * scale), int(h * scale)
+
+    def crop(self, frame):
+        """
+        Cắt và resize vùng mặt về crop_size x crop_size.
+        Nếu không tìm thấy mặt trả về nguyên frame để model vẫn phân loại được.
+        """
+        box = self.locate(frame)
+        if box is None:
+            return frame
+
+        x, y, w, h = box
+        frame_h, frame_w = frame.shape[:2]
+        # Khung vuông có lề, giới hạn trong frame
+        side = int(max(w, h) * (1 + 2 * self.margin))
+        cx, cy = x + w // 2, y + h // 2
+        x0, y0 = max(0, cx - side // 2), max(0, cy - side // 2)
+        x1, y1 = min(frame_w, x0 + side), min(frame_h, y0 + side)
+        roi = frame[y0:y1, x0:x1]
+        if roi.size == 0:
+            return frame
+        return cv2.resize(roi, (self.crop_size, self.crop_size), interpolation=cv2.INTER_AREA)
+
+    def stats(self):
+        return {
+            'face_detect_count': self.detect_count,
+            'face_track_count': self.track_count,
+            'face_miss_count': self.miss_count,
+            'face_track_score': self.track_score,
+        }
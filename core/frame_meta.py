@@ -0,0 +1,31 @@
+import itertools
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+
+class FrameMeta(NamedTuple):
+    """Thông tin gắn với frame ngay lúc đọc từ camera"""
+
+    seq: int  # Số thứ tự tăng dần, duy nhất trong một lần mở camera
+    capture_ts: float  # time.perf_counter() lúc đọc frame, dùng đo độ trễ
+    wall_time: float  # time.time() lúc đọc frame, dùng ghi vào database
+
+    @property
+    def timestamp_id(self):
+        """Id dạng 'YYYYMMDD_HHMMSS' dùng cho DrowsyVideo.startTime/endTime"""
+        return datetime.fromtimestamp(self.wall_time).strftime("%Y%m%d_%H%M%S")
+
+    def age(self, now=None):
+        """Tuổi của frame (giây) tính từ lúc đọc"""
+        return (time.perf_counter() if now is None else now) - self.capture_ts
+
+
+class FrameClock:
+    """Cấp FrameMeta cho từng frame: số thứ tự monotonic và timestamp độ phân giải cao"""
+
+    def __init__(self):
+        self._seq = itertools.count()
+
+    def tag(self):
+        return FrameMeta(next(self._seq), time.perf_counter(), time.time())
@@ -0,0 +1,225 @@
+import ast
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+def preprocess_batch(frames, imgsz, out=None):
+    """
+    Chuẩn hóa batch frame BGR giống classify_transforms của ultralytics:
+    resize cạnh ngắn về imgsz, cắt giữa imgsz x imgsz, BGR -> RGB, chia 255, HWC -> CHW.
+
+    Args:
+        frames: list các frame BGR uint8
+        imgsz: kích thước đầu vào của model
+        out: mảng float32 (N, 3, imgsz, imgsz) dùng lại nếu đủ chỗ
+    Returns: mảng float32 (N, 3, imgsz, imgsz)
+    """
+    n = len(frames)
+    if out is None or out.shape[0] < n or out.shape[2:] != (imgsz, imgsz):
+        out = np.empty((n, 3, imgsz, imgsz), dtype=np.float32)
+    blob = out[:n]
+
+    for i, frame in enumerate(frames):
+        h, w = frame.shape[:2]
+        scale = imgsz / min(h, w)
+        new_w, new_h = max(imgsz, round(w * scale)), max(imgsz, round(h * scale))
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        top, left = (new_h - imgsz) // 2, (new_w - imgsz) // 2
+        crop = resized[top:top + imgsz, left:left + imgsz]
+        # BGR -> RGB bằng cách đảo kênh khi chuyển sang CHW
+        np.multiply(crop[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=blob[i], casting='unsafe')
+    return blob
+
+
+class InferenceBackend:
+    """Giao diện chung cho các engine suy luận của detector"""
+
+    name = "base"
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.names = {}
+
+    def predict(self, frames):
+        """
+        Phân loại một batch frame
+        Args:
+            frames: list các frame BGR
+        Returns: list (class_id, class_name, confidence) theo thứ tự frames
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Giải phóng tài nguyên của backend"""
+        pass
+
+
+class UltralyticsBackend(InferenceBackend):
+    """Backend torch/ultralytics, chạy trực tiếp file .pt"""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path, imgsz=None, **kwargs):
+        super().__init__(model_path)
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.predict_args = {'verbose': False}
+        if imgsz:
+            self.predict_args['imgsz'] = imgsz
+
+    def predict(self, frames):
+        results = self.model(frames, **self.predict_args)
+        predictions = []
+        for result in results:
+            class_id = result.probs.top1
+            predictions.append((class_id, result.names[class_id], result.probs.top1conf.item()))
+        return predictions
+
+
+class OnnxBackend(InferenceBackend):
+    """Backend ONNX Runtime (CPU), chạy model đã export sang .onnx"""
+
+    name = "onnx"
+
+    def __init__(self, model_path, imgsz=None, num_threads=0, **kwargs):
+        super().__init__(model_path)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        self.session = ort.InferenceSession(str(model_path), sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, input_h, _ = model_input.shape
+        # Model export không dynamic chỉ nhận batch cố định
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = self._parse_names(metadata.get('names'))
+        if isinstance(input_h, int):
+            self.imgsz = input_h
+        else:
+            self.imgsz = int(imgsz or self._parse_imgsz(metadata.get('imgsz')) or 640)
+        self._blob = None
+
+    @staticmethod
+    def _parse_names(raw):
+        if not raw:
+            return {0: 'Drowsy', 1: 'Natural'}
+        names = ast.literal_eval(raw)
+        if isinstance(names, list):
+            names = dict(enumerate(names))
+        return {int(k): v for k, v in names.items()}
+
+    @staticmethod
+    def _parse_imgsz(raw):
+        if not raw:
+            return None
+        imgsz = ast.literal_eval(raw)
+        return imgsz[0] if isinstance(imgsz, (list, tuple)) else imgsz
+
+    def _run(self, blob):
+        probs = self.session.run(None, {self.input_name: blob})[0]
+        # Model classify của YOLO đã có softmax, chỉ tính lại nếu output là logits
+        if probs.min() < 0 or not np.allclose(probs.sum(axis=1), 1.0, atol=1e-3):
+            exp = np.exp(probs - probs.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+        return probs
+
+    def predict(self, frames):
+        self._blob = preprocess_batch(frames, self.imgsz, self._blob)
+        blob = self._blob[:len(frames)]
+
+        if self.fixed_batch and self.fixed_batch != len(frames):
+            probs = np.concatenate([self._run(blob[i:i + 1]) for i in range(len(frames))])
+        else:
+            probs = self._run(blob)
+
+        predictions = []
+        for row in probs:
+            class_id = int(row.argmax())
+            predictions.append((class_id, self.names.get(class_id, str(class_id)), float(row[class_id])))
+        return predictions
+
+    def close(self):
+        self.session = None
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def resolve_onnx_paths(model_path, inference_config):
+    """
+    Danh sách file .onnx ứng viên cho model_path, theo thứ tự ưu tiên.
+    Khi precision = "int8" thì model lượng tử hóa được thử trước, sau đó mới đến model FP32.
+    """
+    if str(model_path).endswith('.onnx'):
+        return [str(model_path)]
+    candidates = []
+    if inference_config.get('precision', 'fp32') == 'int8':
+        candidates.append(inference_config.get('int8_model_path') or str(Path(model_path).with_suffix('.int8.onnx')))
+    candidates.append(inference_config.get('onnx_model_path') or str(Path(model_path).with_suffix('.onnx')))
+    return candidates
+
+
+def create_backend(model_path, inference_config=None):
+    """
+    Tạo backend suy luận theo cấu hình `inference` trong config.json
+    Args:
+        model_path: Đường dẫn đến model (.pt hoặc .onnx)
+        inference_config: dict cấu hình, ví dụ {"backend": "onnx", "precision": "int8"}
+    """
+    inference_config = inference_config or {}
+    backend_name = inference_config.get('backend', 'ultralytics')
+    if str(model_path).endswith('.onnx'):
+        backend_name = OnnxBackend.name
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Backend không hợp lệ: {backend_name} (hỗ trợ: {', '.join(BACKENDS)})")
+
+    if inference_config.get('out_of_process'):
+        # Chạy backend thật trong process riêng, frame truyền qua shared memory
+        from core.inference_process import ProcessBackend
+
+        print("⚙️ Chạy suy luận trong process riêng")
+        return ProcessBackend(model_path, {**inference_config, 'out_of_process': False},
+                              slots=inference_config.get('shared_memory_slots', 8))
+
+    options = {
+        'imgsz': inference_config.get('imgsz'),
+        'num_threads': inference_config.get('num_threads', 0),
+    }
+
+    if backend_name == OnnxBackend.name:
+        for onnx_path in resolve_onnx_paths(model_path, inference_config):
+            if Path(onnx_path).exists():
+                print(f"⚙️ Sử dụng backend ONNX Runtime: {onnx_path}")
+                return OnnxBackend(onnx_path, **options)
+            print(f"⚠️ Không tìm thấy {onnx_path}")
+        print("⚠️ Chuyển sang backend ultralytics")
+
+    print(f"⚙️ Sử dụng backend ultralytics: {model_path}")
+    return UltralyticsBackend(model_path, **options)
+
+
+def export_onnx(model_path, imgsz=None, dynamic=True):
+    """
+    Export model .pt sang .onnx bằng ultralytics
+    Returns: đường dẫn file .onnx
+    """
+    from ultralytics import YOLO
+
+    export_args = {'format': 'onnx', 'dynamic': dynamic}
+    if imgsz:
+        export_args['imgsz'] = imgsz
+    return YOLO(model_path).export(**export_args)
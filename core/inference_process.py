@@ -0,0 +1,217 @@
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.inference_backend import InferenceBackend, create_backend
+
+
+class SharedFrameRing:
+    """Ring buffer các slot frame uint8 nằm trong shared memory, dùng chung giữa 2 process"""
+
+    def __init__(self, slots, slot_bytes, name=None):
+        """
+        Args:
+            slots: Số slot trong ring
+            slot_bytes: Kích thước tối đa (byte) của một frame
+            name: Tên shared memory đã có (process con gắn vào), None để tạo mới
+        """
+        self.slots = int(slots)
+        self.slot_bytes = int(slot_bytes)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.buffer = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf)
+        self._next_slot = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame):
+        """Ghi frame vào slot tiếp theo, trả về (slot, shape)"""
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        frame = np.ascontiguousarray(frame)
+        self.buffer[slot, :frame.nbytes].reshape(frame.shape)[...] = frame
+        return slot, frame.shape
+
+    def view(self, slot, shape):
+        """View (không copy) của frame trong slot"""
+        nbytes = int(np.prod(shape))
+        return self.buffer[slot, :nbytes].reshape(shape)
+
+    def close(self):
+        # Phải bỏ tham chiếu numpy trước khi đóng shared memory
+        self.buffer = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(shm_name, slots, slot_bytes, model_path, inference_config, request_queue, result_queue):
+    """Vòng lặp của process suy luận"""
+    ring = SharedFrameRing(slots, slot_bytes, name=shm_name)
+    try:
+        backend = create_backend(model_path, inference_config)
+        result_queue.put(('ready', dict(backend.names)))
+    except Exception as e:
+        result_queue.put(('error', str(e)))
+        ring.close()
+        return
+
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+        batch_id, items = request
+        try:
+            frames = [ring.view(slot, shape) for slot, shape in items]
+            predictions = backend.predict(frames)
+            # Chỉ gửi (class_id, confidence), tên class đã gửi một lần lúc sẵn sàng
+            result_queue.put((batch_id, [(int(class_id), float(conf)) for class_id, _, conf in predictions]))
+        except Exception as e:
+            result_queue.put((batch_id, e.__class__.__name__ + ": " + str(e)))
+
+    backend.close()
+    ring.close()
+
+
+class ProcessBackend(InferenceBackend):
+    """
+    Backend chạy model trong process riêng để không tranh GIL với giao diện.
+    Frame được truyền qua SharedFrameRing (không pickle mảng numpy), kết quả trả về là tuple gọn.
+    """
+
+    name = "process"
+
+    def __init__(self, model_path, inference_config=None, slots=8, startup_timeout=120.0, batch_timeout=10.0):
+        super().__init__(model_path)
+        self.inference_config = dict(inference_config or {})
+        self.slots = int(slots)
+        self.startup_timeout = startup_timeout
+        self.batch_timeout = batch_timeout
+        self.restart_count = 0
+
+        self._ctx = mp.get_context('spawn')
+        self._lock = threading.Lock()
+        self._batch_ids = itertools.count()
+        self._ring = None
+        self._process = None
+        self._request_queue = None
+        self._result_queue = None
+        self._ready = False
+
+    def _start(self, slot_bytes):
+        """Khởi động process con (không chờ model load xong)"""
+        if self._ring is None or self._ring.slot_bytes < slot_bytes:
+            if self._ring is not None:
+                self._ring.close()
+            self._ring = SharedFrameRing(self.slots, slot_bytes)
+
+        self._request_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._ring.name, self._ring.slots, self._ring.slot_bytes, self.model_path,
+                  self.inference_config, self._request_queue, self._result_queue),
+            daemon=True,
+        )
+        self._process.start()
+        self._ready = False
+        print(f"🚀 Process suy luận đã khởi động (pid={self._process.pid})")
+
+    def _wait_ready(self):
+        try:
+            status, payload = self._result_queue.get(timeout=self.startup_timeout)
+        except queue.Empty:
+            raise RuntimeError("Process suy luận không sẵn sàng (quá thời gian load model)")
+        if status != 'ready':
+            raise RuntimeError(f"Process suy luận lỗi khi load model: {payload}")
+        self.names = payload
+        self._ready = True
+
+    def _shutdown_process(self):
+        if self._process is None:
+            return
+        try:
+            self._request_queue.put_nowait(None)
+        except Exception:
+            pass
+        self._process.join(timeout=2)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1)
+        self._process = None
+        self._ready = False
+
+    def restart(self):
+        """Khởi động lại process suy luận, giữ nguyên shared memory"""
+        with self._lock:
+            slot_bytes = self._ring.slot_bytes if self._ring else 0
+            self._shutdown_process()
+            self.restart_count += 1
+            if slot_bytes:
+                self._start(slot_bytes)
+            print(f"🔁 Đã khởi động lại process suy luận (lần {self.restart_count})")
+
+    def _run_batch(self, frames):
+        items = [self._ring.write(frame) for frame in frames]
+        batch_id = next(self._batch_ids)
+        self._request_queue.put((batch_id, items))
+
+        deadline = time.monotonic() + self.batch_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError("Process suy luận không phản hồi")
+            try:
+                # Chờ theo từng đoạn ngắn để phát hiện sớm process con bị chết
+                result_id, payload = self._result_queue.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise RuntimeError("Process suy luận đã dừng")
+                continue
+            if result_id == batch_id:
+                break
+        if isinstance(payload, str):
+            raise RuntimeError(payload)
+        return [(class_id, self.names.get(class_id, str(class_id)), conf) for class_id, conf in payload]
+
+    def predict(self, frames):
+        slot_bytes = max(frame.nbytes for frame in frames)
+        with self._lock:
+            # Khởi động lần đầu, hoặc tạo lại ring nếu frame lớn hơn slot hiện tại
+            if self._process is None or self._ring.slot_bytes < slot_bytes:
+                self._shutdown_process()
+                self._start(slot_bytes)
+
+            for attempt in range(2):
+                try:
+                    if not self._ready:
+                        self._wait_ready()
+                    predictions = []
+                    for i in range(0, len(frames), self.slots):
+                        predictions += self._run_batch(frames[i:i + self.slots])
+                    return predictions
+                except RuntimeError as e:
+                    print(f"⚠️ {e}")
+                    if attempt:
+                        raise
+                    # Tự khởi động lại process một lần rồi thử lại
+                    self._shutdown_process()
+                    self.restart_count += 1
+                    self._start(self._ring.slot_bytes)
+
+    def close(self):
+        with self._lock:
+            self._shutdown_process()
+            if self._ring is not None:
+                self._ring.close()
+                self._ring = None
@@ -0,0 +1,110 @@
+import bisect
+import json
+import threading
+import time
+
+# Cận trên (ms) của các bucket cố định, bucket cuối nhận mọi giá trị lớn hơn
+DEFAULT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000, 2000)
+
+# Các giai đoạn của một frame từ camera đến màn hình
+STAGES = ('capture', 'queue_wait', 'inference', 'postprocess', 'overlay', 'pixmap', 'gui_paint')
+
+
+class LatencyHistogram:
+    """Histogram độ trễ với bucket cố định: ghi O(log số bucket), không cấp phát, đọc p50/p95/p99"""
+
+    def __init__(self, bounds_ms=DEFAULT_BUCKETS_MS):
+        self.bounds = tuple(float(bound) for bound in bounds_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q):
+        """Giá trị tại phân vị q (0-1), nội suy tuyến tính trong bucket chứa phân vị"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= target:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max_ms
+                value = lower + (upper - lower) * (target - cumulative) / bucket_count
+                return min(value, self.max_ms)
+            cumulative += bucket_count
+        return self.max_ms
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max_ms,
+            'buckets': {('+Inf' if i == len(self.bounds) else f"{self.bounds[i]:g}"): bucket_count
+                        for i, bucket_count in enumerate(self.counts)},
+        }
+
+
+class StageLatencies:
+    """
+    Histogram độ trễ theo từng giai đoạn của một luồng camera.
+    Mỗi giai đoạn thường chỉ được ghi từ một thread (camera, xử lý YOLO hoặc GUI) nên không cần khóa khi ghi.
+    """
+
+    def __init__(self, stages=STAGES, bounds_ms=DEFAULT_BUCKETS_MS):
+        self.bounds_ms = bounds_ms
+        self.histograms = {stage: LatencyHistogram(bounds_ms) for stage in stages}
+        self._lock = threading.Lock()
+
+    def record(self, stage, ms):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram(self.bounds_ms))
+        histogram.record(ms)
+
+    def record_since(self, stage, start):
+        """Ghi thời gian từ start (time.perf_counter()) đến hiện tại, trả về thời điểm hiện tại"""
+        now = time.perf_counter()
+        self.record(stage, (now - start) * 1000)
+        return now
+
+    def reset(self):
+        for histogram in list(self.histograms.values()):
+            histogram.reset()
+
+    def snapshot(self):
+        """dict {giai đoạn: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, buckets}}"""
+        return {stage: histogram.snapshot() for stage, histogram in list(self.histograms.items())}
+
+    def to_json(self, path, extra=None):
+        """Ghi snapshot ra file JSON (kèm thông tin thêm nếu có)"""
+        report = {'timestamp': time.time(), 'stages': self.snapshot(), **(extra or {})}
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=4)
+        return path
+
+    def format_table(self):
+        """Bảng p50/p95/p99 dạng text để hiển thị"""
+        lines = [f"{'stage':<12}{'n':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}"]
+        for stage, histogram in list(self.histograms.items()):
+            lines.append(f"{stage:<12}{histogram.count:>7}{histogram.percentile(0.5):>8.1f}"
+                         f"{histogram.percentile(0.95):>8.1f}{histogram.percentile(0.99):>8.1f}"
+                         f"{histogram.max_ms:>8.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+
+class MetricsSampler:
+    """
+    Thread nền định kỳ lấy DrowsinessDetector.metrics() của các luồng và ghi log
+    (console, thêm file JSON Lines nếu có log_path). Cảnh báo khi luồng không theo kịp:
+    có frame bị bỏ trong chu kỳ hoặc suy luận chậm hơn tốc độ nhận frame.
+    """
+
+    def __init__(self, detectors, interval_s=10.0, log_path=None):
+        """
+        Args:
+            detectors: list DrowsinessDetector cần theo dõi
+            interval_s: chu kỳ lấy mẫu (giây)
+            log_path: file .jsonl ghi mỗi mẫu một dòng, None để chỉ in ra console
+        """
+        self.detectors = list(detectors)
+        self.interval = max(0.5, float(interval_s))
+        self.log_path = log_path
+        self._previous = {}
+        self._stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Lấy một mẫu của mọi luồng, trả về list snapshot"""
+        snapshots = []
+        for index, detector in enumerate(self.detectors):
+            metrics = detector.metrics()
+            name = metrics['stream'] or f"stream{index}"
+            previous = self._previous.get(name)
+            self._previous[name] = metrics
+            # FPS suy luận trong chu kỳ vừa qua (lần đầu tính từ lúc luồng bắt đầu)
+            elapsed = metrics['uptime_s'] - (previous['uptime_s'] if previous else 0.0)
+            inferred = metrics['frames_inferred'] - (previous['frames_inferred'] if previous else 0)
+            inference_fps = inferred / elapsed if elapsed > 0 else 0.0
+            snapshots.append({'timestamp': time.time(), **metrics, 'stream': name, 'inference_fps': inference_fps})
+            print(self._format(name, metrics, previous, inference_fps))
+
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a') as file:
+                    for snapshot in snapshots:
+                        file.write(json.dumps(snapshot) + "\n")
+            except OSError as e:
+                print(f"⚠️ Không ghi được metrics: {e}")
+        return snapshots
+
+    @staticmethod
+    def _format(name, metrics, previous, inference_fps):
+        dropped = metrics['dropped_frames']
+        line = (f"📈 [{name}] nhận {metrics['frames_captured']} | queue {metrics['frames_enqueued']} | "
+                f"suy luận {metrics['frames_inferred']} ({inference_fps:.1f} FPS) | "
+                f"batch {metrics['batches']} (TB {metrics['avg_batch_size']:.1f}) | "
+                f"queue {metrics['processing_queue_depth']}/{metrics['processing_queue_capacity']} | "
+                f"chờ xử lý {metrics['result_backlog']} | bỏ {dict((k, v) for k, v in dropped.items() if v)}")
+        if previous is None:
+            return line
+
+        elapsed = metrics['uptime_s'] - previous['uptime_s']
+        dropped_delta = metrics['dropped_total'] - previous['dropped_total']
+        captured_rate = (metrics['frames_captured'] - previous['frames_captured']) / elapsed if elapsed > 0 else 0.0
+        if dropped_delta > 0 or inference_fps < 0.8 * captured_rate:
+            line += (f"\n⚠️ [{name}] không theo kịp: bỏ {dropped_delta} frame trong {elapsed:.0f}s, "
+                     f"nhận {captured_rate:.1f} FPS, suy luận {inference_fps:.1f} FPS")
+        return line
@@ -0,0 +1,140 @@
+"""
+Endpoint metrics dạng text của Prometheus cho detector (http://127.0.0.1:<port>/metrics).
+
+Dùng http.server của thư viện chuẩn trong thread nền. Số liệu chỉ được đọc và định dạng khi có
+request tới /metrics, khi không ai scrape thì thread chỉ nằm chờ trên socket.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import db.db as db
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class _MetricsWriter:
+    """Gom sample theo metric family (mọi sample của một family phải liền nhau trong output)"""
+
+    def __init__(self):
+        self.families = {}  # tên -> (dòng HELP/TYPE, list sample), giữ thứ tự khai báo
+
+    def declare(self, name, metric_type, help_text):
+        if name not in self.families:
+            self.families[name] = ([f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"], [])
+
+    def sample(self, name, value, family=None, **labels):
+        self.families[family or name][1].append(f"{name}{_labels(**labels) if labels else ''} {float(value):.6g}")
+
+    def histogram(self, name, histogram, **labels):
+        """LatencyHistogram (ms) -> histogram Prometheus (giây, bucket cộng dồn)"""
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            self.sample(f"{name}_bucket", cumulative, family=name, **labels, le=f"{bound / 1000:g}")
+        self.sample(f"{name}_bucket", histogram.count, family=name, **labels, le="+Inf")
+        self.sample(f"{name}_sum", histogram.total_ms / 1000, family=name, **labels)
+        self.sample(f"{name}_count", histogram.count, family=name, **labels)
+
+    def text(self):
+        lines = []
+        for header, samples in self.families.values():
+            lines += header + samples
+        return "\n".join(lines) + "\n"
+
+
+def render_metrics(detectors):
+    """Định dạng metrics của các luồng và thời gian ghi database theo text format của Prometheus"""
+    writer = _MetricsWriter()
+    # Batch và processing_queue thuộc engine (nhiều camera dùng chung một engine), chỉ xuất một lần cho mỗi engine
+    engines = {}
+    for index, detector in enumerate(detectors):
+        metrics = detector.metrics()
+        stream = metrics['stream'] or f"stream{index}"
+
+        writer.declare('drowsy_frames_total', 'counter', 'Số frame theo giai đoạn (captured, enqueued, inferred)')
+        for stage in ('captured', 'enqueued', 'inferred'):
+            writer.sample('drowsy_frames_total', metrics[f'frames_{stage}'], stream=stream, stage=stage)
+        writer.declare('drowsy_dropped_frames_total', 'counter', 'Số frame bị bỏ theo lý do')
+        for reason, count in metrics['dropped_frames'].items():
+            writer.sample('drowsy_dropped_frames_total', count, stream=stream, reason=reason)
+        writer.declare('drowsy_alerts_total', 'counter', 'Số lần cảnh báo buồn ngủ')
+        writer.sample('drowsy_alerts_total', metrics['alerts'], stream=stream)
+
+        writer.declare('drowsy_result_backlog', 'gauge', 'Số kết quả suy luận chờ luồng xử lý')
+        writer.sample('drowsy_result_backlog', metrics['result_backlog'], stream=stream)
+        writer.declare('drowsy_frame_latency_seconds', 'gauge', 'Độ trễ capture -> có kết quả của frame mới nhất')
+        writer.sample('drowsy_frame_latency_seconds', metrics['frame_latency_ms'] / 1000, stream=stream)
+
+        writer.declare('drowsy_stage_latency_seconds', 'histogram', 'Độ trễ từng giai đoạn xử lý frame')
+        for stage, histogram in list(detector.latency.histograms.items()):
+            writer.histogram('drowsy_stage_latency_seconds', histogram, stream=stream, stage=stage)
+        engines.setdefault(id(detector.engine), detector.engine)
+
+    for index, engine in enumerate(engines.values()):
+        writer.declare('drowsy_batches_total', 'counter', 'Số batch suy luận của engine')
+        writer.sample('drowsy_batches_total', engine.batcher.batch_count, engine=index)
+        writer.declare('drowsy_avg_batch_size', 'gauge', 'Kích thước batch trung bình (EMA) của engine')
+        writer.sample('drowsy_avg_batch_size', engine.batcher.avg_batch_size, engine=index)
+        writer.declare('drowsy_queue_depth', 'gauge', 'Số frame đang chờ trong processing_queue của engine')
+        writer.sample('drowsy_queue_depth', engine.processing_queue.qsize(), engine=index)
+        writer.declare('drowsy_queue_capacity', 'gauge', 'Sức chứa processing_queue của engine')
+        writer.sample('drowsy_queue_capacity', engine.processing_queue.maxsize, engine=index)
+
+    writer.declare('drowsy_db_write_latency_seconds', 'histogram', 'Thời gian các hàm ghi database của repository')
+    for operation, histogram in list(db.write_latency.histograms.items()):
+        writer.histogram('drowsy_db_write_latency_seconds', histogram, operation=operation)
+    return writer.text()
+
+
+class MetricsServer:
+    """HTTP server phục vụ /metrics trong thread nền"""
+
+    def __init__(self, detectors_provider, host='127.0.0.1', port=9108):
+        """
+        Args:
+            detectors_provider: hàm trả về list DrowsinessDetector đang chạy (gọi mỗi lần scrape)
+            host: mặc định chỉ nghe trên loopback
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                try:
+                    body = render_metrics(detectors_provider()).encode('utf-8')
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self.thread.start()
+        print(f"📡 Metrics Prometheus: {self.address}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,169 @@
+"""
+Cache model suy luận dùng chung trong toàn process.
+
+Mỗi file weight chỉ được nạp một lần (khóa theo đường dẫn, hash nội dung file và cấu hình `inference`),
+các lần bắt đầu/dừng giám sát sau đó dùng lại model đã nạp thay vì đọc lại từ đĩa. Cache chỉ giữ model được
+yêu cầu gần nhất: khi nạp model khác (đổi weight, file weight đổi nội dung hoặc đổi cấu hình), các model cũ được
+giải phóng ngay khi không còn engine nào dùng.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from core.inference_backend import create_backend
+
+
+class _CachedModel:
+    def __init__(self, key):
+        self.key = key
+        self.backend = None
+        self.error = None
+        self.ready = threading.Event()
+        self.users = 0  # số engine đang dùng
+        self.stale = False  # đã bị thay bằng phiên bản weight mới
+
+
+_lock = threading.Lock()
+_models = {}  # đường dẫn tuyệt đối -> _CachedModel (model mới nhất, cùng các model cũ còn engine dùng)
+_retired = {}  # id(_CachedModel) -> model đã bị thay bằng model mới nhưng còn engine dùng (hoặc đang nạp)
+_file_hashes = {}  # (đường dẫn, kích thước, mtime) -> sha256, tránh hash lại file không đổi
+
+
+def file_hash(path):
+    """SHA-256 nội dung file weight (nhớ theo kích thước + mtime)"""
+    stat = os.stat(path)
+    memo_key = (path, stat.st_size, stat.st_mtime_ns)
+    digest = _file_hashes.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        _file_hashes[memo_key] = digest
+    return digest
+
+
+def cache_key(model_path, inference_config=None):
+    path = os.path.abspath(model_path)
+    return path, file_hash(path), json.dumps(inference_config or {}, sort_keys=True, default=str)
+
+
+def warmup(backend, batch_size=4, frame_shape=(480, 640, 3)):
+    """Chạy một batch giả để khởi tạo bộ nhớ/kernel của backend trước frame thật"""
+    start = time.perf_counter()
+    backend.predict([np.zeros(frame_shape, dtype=np.uint8)] * max(1, int(batch_size)))
+    return (time.perf_counter() - start) * 1000
+
+
+def acquire(model_path, inference_config=None, warmup_batch=0, frame_shape=(480, 640, 3), timings=None):
+    """
+    Lấy backend đã nạp cho model_path, nạp mới nếu chưa có trong cache.
+    Nếu một thread khác đang nạp cùng model thì chờ thread đó thay vì nạp lần nữa.
+    Mỗi lần acquire phải đi kèm một lần release.
+    Args:
+        warmup_batch: > 0 thì chạy một batch giả kích thước này sau khi nạp (chỉ lần đầu)
+        timings: dict nhận thời gian từng bước (ms): hash_ms, load_ms, warmup_ms, wait_ms
+    Returns: InferenceBackend
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    key = cache_key(model_path, inference_config)
+    timings['hash_ms'] = (time.perf_counter() - start) * 1000
+    stale = []
+    with _lock:
+        entry = _models.get(key[0])
+        loader = entry is None or entry.key != key
+        if loader:
+            # Chỉ giữ một model: mọi model khác (kể cả phiên bản cũ của cùng file) bị thay thế
+            for old in _models.values():
+                old.stale = True
+                if old.users == 0:
+                    stale.append(old)
+                else:
+                    _retired[id(old)] = old
+            _models.clear()
+            entry = _CachedModel(key)
+            _models[key[0]] = entry
+        entry.users += 1
+
+    for old in stale:
+        _close(old)
+
+    if loader:
+        try:
+            start = time.perf_counter()
+            entry.backend = create_backend(model_path, inference_config)
+            timings['load_ms'] = (time.perf_counter() - start) * 1000
+            print(f"📦 Đã nạp model {model_path} ({timings['load_ms']:.0f} ms)")
+            if warmup_batch:
+                timings['warmup_ms'] = warmup(entry.backend, warmup_batch, frame_shape)
+                print(f"🔥 Warmup model: {timings['warmup_ms']:.0f} ms")
+        except Exception as e:
+            entry.error = e
+            with _lock:
+                if _models.get(key[0]) is entry:
+                    del _models[key[0]]
+        finally:
+            entry.ready.set()
+    else:
+        # Đã có trong cache hoặc thread khác đang nạp
+        start = time.perf_counter()
+        entry.ready.wait()
+        timings['wait_ms'] = (time.perf_counter() - start) * 1000
+
+    if entry.error is not None:
+        with _lock:
+            entry.users -= 1
+        raise entry.error
+    return entry.backend
+
+
+def release(backend):
+    """Trả lại backend lấy bằng acquire; model vẫn nằm trong cache trừ khi đã có phiên bản mới"""
+    with _lock:
+        # Phiên bản cũ đã bị thay thế thì giải phóng khi engine cuối cùng trả lại
+        entry = next((e for e in list(_models.values()) + list(_retired.values()) if e.backend is backend), None)
+        if entry is None:
+            return
+        entry.users = max(0, entry.users - 1)
+        close = entry.stale and entry.users == 0
+        if close:
+            _retired.pop(id(entry), None)
+    if close:
+        _close(entry)
+
+
+def _close(entry):
+    entry.ready.wait()
+    if entry.backend is not None:
+        try:
+            entry.backend.close()
+        except Exception as e:
+            print(f"⚠️ Lỗi giải phóng model: {e}")
+        entry.backend = None
+
+
+def is_loaded(model_path, inference_config=None):
+    """Model đã nạp xong và nằm trong cache chưa"""
+    try:
+        key = cache_key(model_path, inference_config)
+    except OSError:
+        return False
+    with _lock:
+        entry = _models.get(key[0])
+    return entry is not None and entry.key == key and entry.ready.is_set() and entry.error is None
+
+
+def clear():
+    """Giải phóng mọi model trong cache (gọi khi thoát ứng dụng)"""
+    with _lock:
+        entries = list(_models.values()) + list(_retired.values())
+        _models.clear()
+        _retired.clear()
+    for entry in entries:
+        _close(entry)
@@ -0,0 +1,235 @@
+"""
+Phân tích buồn ngủ trên video ghi sẵn, không cần giao diện hay camera.
+
+Chia 2 bước để có thể chạy song song:
+    1. predict_frames: giải mã + phân loại từng batch frame (có thể chạy theo đoạn frame)
+    2. detect_alert_intervals: chạy lại luật cảnh báo theo thứ tự thời gian trong video
+"""
+import os
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+import cv2
+
+from core.alert_tracker import AlertTracker
+from core.face_roi import FaceRoiCropper
+from core.inference_backend import create_backend
+from core.rolling_stats import DrowsinessStats
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.webm', '.mpg', '.mpeg', '.ts')
+
+
+# Model của worker process, nạp một lần trong init_worker
+worker_backend = None
+worker_face_cropper = None
+
+
+def init_worker(model_path, inference_config, face_roi_config):
+    """Initializer cho worker process phân tích offline: mỗi process giữ một model"""
+    global worker_backend, worker_face_cropper
+    # Worker đã là process riêng, không cần thêm process suy luận
+    worker_backend = create_backend(model_path, {**inference_config, 'out_of_process': False})
+    worker_face_cropper = FaceRoiCropper(**face_roi_config) if face_roi_config.get('enabled') else None
+
+
+def worker_inference_config(inference_config, workers):
+    """Chia đều số thread ONNX Runtime cho các worker khi để tự chọn, tránh tranh CPU giữa các process"""
+    if workers > 1 and not inference_config.get('num_threads'):
+        return {**inference_config, 'num_threads': max(1, (os.cpu_count() or 1) // workers)}
+    return inference_config
+
+
+class FramePrediction(NamedTuple):
+    frame_idx: int
+    timestamp: float  # giây tính từ đầu video
+    class_id: int
+    class_name: str
+    confidence: float
+    is_drowsy: bool
+
+
+class AlertInterval(NamedTuple):
+    start_time: float  # giây tính từ đầu video
+    end_time: float
+    start_frame: int
+    end_frame: int
+    alert_count: int  # số lần cảnh báo trong khoảng (cách nhau theo cooldown)
+    peak_ratio: float  # tỷ lệ buồn ngủ cao nhất trong khoảng
+    avg_confidence: float
+
+
+def find_videos(inputs):
+    """Danh sách file video từ các đường dẫn file/thư mục (quét đệ quy thư mục)"""
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                videos += [os.path.join(root, name) for name in sorted(names)
+                           if name.lower().endswith(VIDEO_EXTENSIONS)]
+        else:
+            videos.append(path)
+    return sorted(videos)
+
+
+def video_info(path):
+    """Thông tin cơ bản của video: fps, số frame, kích thước"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise IOError(f"Không mở được video: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        return {
+            'fps': fps if fps and fps > 0 else 30.0,
+            'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def iter_frame_batches(path, batch_size=4, stride=1, start_frame=0, end_frame=None, prefetch=4):
+    """
+    Giải mã video trong thread riêng (song song với suy luận) và trả về từng batch
+    Args:
+        stride: chỉ lấy 1 frame mỗi `stride` frame (frame bỏ qua chỉ grab, không chuyển màu)
+        start_frame, end_frame: đoạn frame [start_frame, end_frame) cần đọc
+        prefetch: số batch giải mã trước tối đa
+    Yields: (frame_indices, frames)
+    """
+    batches = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    errors = []
+
+    def decode():
+        cap = cv2.VideoCapture(path)
+        try:
+            if not cap.isOpened():
+                raise IOError(f"Không mở được video: {path}")
+            if start_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            indices, frames = [], []
+            frame_idx = start_frame
+            while not stop.is_set() and (end_frame is None or frame_idx < end_frame):
+                if (frame_idx - start_frame) % stride:
+                    if not cap.grab():
+                        break
+                else:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    indices.append(frame_idx)
+                    frames.append(frame)
+                    if len(frames) == batch_size:
+                        batches.put((indices, frames))
+                        indices, frames = [], []
+                frame_idx += 1
+            if frames:
+                batches.put((indices, frames))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            cap.release()
+            batches.put(None)
+
+    thread = threading.Thread(target=decode, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            yield batch
+    finally:
+        # Bên gọi dừng sớm: cho thread giải mã thoát khỏi put()
+        stop.set()
+        while thread.is_alive():
+            try:
+                batches.get_nowait()
+            except queue.Empty:
+                thread.join(timeout=0.05)
+    if errors:
+        raise errors[0]
+
+
+def predict_frames(backend, path, fps, batch_size=4, stride=1, start_frame=0, end_frame=None, face_cropper=None):
+    """
+    Phân loại các frame trong đoạn [start_frame, end_frame) của video
+    Returns: list FramePrediction theo thứ tự frame
+    """
+    predictions = []
+    for indices, frames in iter_frame_batches(path, batch_size, stride, start_frame, end_frame):
+        model_inputs = [face_cropper.crop(frame) for frame in frames] if face_cropper else frames
+        for frame_idx, (class_id, class_name, confidence) in zip(indices, backend.predict(model_inputs)):
+            predictions.append(FramePrediction(frame_idx, frame_idx / fps, int(class_id), class_name,
+                                               float(confidence), class_name.lower() == 'drowsy'))
+    return predictions
+
+
+def detect_alert_intervals(predictions, sample_rate, alert_threshold=3, cooldown=3):
+    """
+    Chạy luật cảnh báo của detector realtime trên kết quả theo thứ tự thời gian trong video.
+    Mỗi khoảng bắt đầu khi tỷ lệ buồn ngủ vượt ngưỡng (và sau đó có cảnh báo) và kết thúc khi tỷ lệ
+    trở về mức bình thường hoặc hết video.
+    Args:
+        predictions: list FramePrediction đã sắp theo frame_idx
+        sample_rate: số frame được phân loại mỗi giây video (fps / stride), thay cho mốc 30 FPS của camera
+    Returns: list AlertInterval
+    """
+    # Cùng độ dài cửa sổ như detector realtime: alert_threshold giây, tối thiểu 1 giây mẫu
+    stats = DrowsinessStats(window_size=max(1, int(round(sample_rate * alert_threshold))), time_windows=())
+    tracker = AlertTracker(alert_threshold=alert_threshold, cooldown=cooldown,
+                           min_samples=max(1, int(round(sample_rate))))
+
+    intervals = []
+    episode_start = None  # (time, frame) lúc tỷ lệ bắt đầu vượt ngưỡng
+    current = None  # khoảng cảnh báo đang mở
+    for prediction in predictions:
+        stats.add(prediction.is_drowsy, prediction.confidence, now=prediction.timestamp)
+        was_tracking = tracker.alert_start_time is not None
+        fired = tracker.check(stats, prediction.timestamp)
+
+        if not was_tracking and tracker.alert_start_time is not None:
+            episode_start = (prediction.timestamp, prediction.frame_idx)
+
+        if fired:
+            if current is None:
+                current = {'start': episode_start, 'count': 0, 'peak': 0.0, 'conf_sum': 0.0, 'samples': 0}
+            current['count'] += 1
+
+        if current is not None:
+            current['peak'] = max(current['peak'], stats.drowsy_ratio)
+            current['conf_sum'] += prediction.confidence
+            current['samples'] += 1
+            if tracker.alert_start_time is None:
+                intervals.append(_close_interval(current, prediction))
+                current = None
+
+    if current is not None:
+        intervals.append(_close_interval(current, predictions[-1]))
+    return intervals
+
+
+def _close_interval(current, last_prediction):
+    start_time, start_frame = current['start']
+    return AlertInterval(start_time, last_prediction.timestamp, start_frame, last_prediction.frame_idx,
+                         current['count'], current['peak'], current['conf_sum'] / max(1, current['samples']))
+
+
+def analyze_video(backend, path, batch_size=4, stride=1, alert_threshold=3, face_cropper=None):
+    """
+    Phân tích toàn bộ một video
+    Returns: (info, predictions, intervals) với info gồm fps, số frame, thời gian xử lý
+    """
+    info = video_info(path)
+    if face_cropper is not None:
+        face_cropper.reset()
+
+    start = time.perf_counter()
+    predictions = predict_frames(backend, path, info['fps'], batch_size, stride, face_cropper=face_cropper)
+    intervals = detect_alert_intervals(predictions, info['fps'] / stride, alert_threshold)
+    info['analyzed_frames'] = len(predictions)
+    info['elapsed'] = time.perf_counter() - start
+    return info, predictions, intervals
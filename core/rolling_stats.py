@@ -0,0 +1,152 @@
+import time
+from collections import deque
+
+
+class RollingWindow:
+    """Cửa sổ trượt theo số mẫu, giữ tổng chạy để lấy trung bình O(1)"""
+
+    def __init__(self, maxlen):
+        self.maxlen = int(maxlen)
+        self.values = deque(maxlen=self.maxlen)
+        self.total = 0.0
+        self._evictions = 0
+
+    def append(self, value):
+        if len(self.values) == self.maxlen:
+            self.total -= self.values[0]
+            self._evictions += 1
+        self.values.append(value)
+        self.total += value
+        # Tính lại tổng định kỳ để tránh sai số cộng dồn của số thực
+        if self._evictions >= self.maxlen:
+            self.total = float(sum(self.values))
+            self._evictions = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0.0
+
+    def clear(self):
+        self.values.clear()
+        self.total = 0.0
+        self._evictions = 0
+
+
+class TimeWindow:
+    """Cửa sổ trượt theo thời gian (giây), có trung bình thường và trung bình theo thời gian"""
+
+    def __init__(self, seconds):
+        self.seconds = float(seconds)
+        # Mỗi phần tử: [timestamp, value, duration] (duration tính khi có mẫu kế tiếp)
+        self.samples = deque()
+        self.total = 0.0
+        self.weighted_total = 0.0
+        self.covered = 0.0
+
+    def append(self, value, now):
+        if self.samples:
+            last = self.samples[-1]
+            last[2] = max(0.0, now - last[0])
+            self.weighted_total += last[1] * last[2]
+            self.covered += last[2]
+        self.samples.append([now, value, 0.0])
+        self.total += value
+        self.evict(now)
+
+    def evict(self, now):
+        cutoff = now - self.seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            _, value, duration = self.samples.popleft()
+            self.total -= value
+            self.weighted_total -= value * duration
+            self.covered -= duration
+        if not self.samples:
+            self.total = self.weighted_total = self.covered = 0.0
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def mean(self):
+        return self.total / len(self.samples) if self.samples else 0.0
+
+    def time_weighted_mean(self, now):
+        """Trung bình có trọng số theo thời gian mỗi giá trị được giữ (mẫu cuối giữ đến now)"""
+        if not self.samples:
+            return 0.0
+        last_t, last_value, _ = self.samples[-1]
+        tail = max(0.0, now - last_t)
+        covered = self.covered + tail
+        if covered <= 0:
+            return last_value
+        return (self.weighted_total + last_value * tail) / covered
+
+    def clear(self):
+        self.samples.clear()
+        self.total = self.weighted_total = self.covered = 0.0
+
+
+class DrowsinessStats:
+    """
+    Thống kê trượt cho detector: tỷ lệ buồn ngủ và confidence trung bình trên N mẫu gần nhất,
+    EMA và các cửa sổ thời gian (mặc định 1s/3s/10s) cho dashboard. Mọi thao tác là O(1).
+    """
+
+    def __init__(self, window_size=90, time_windows=(1, 3, 10), ema_alpha=0.1):
+        self.drowsy = RollingWindow(window_size)
+        self.confidence = RollingWindow(window_size)
+        self.ema_alpha = float(ema_alpha)
+        self.drowsy_ema = 0.0
+        self.time_windows = {
+            seconds: (TimeWindow(seconds), TimeWindow(seconds)) for seconds in time_windows
+        }
+
+    def add(self, is_drowsy, confidence, now=None):
+        now = time.monotonic() if now is None else now
+        value = 1.0 if is_drowsy else 0.0
+        if len(self.drowsy) == 0:
+            self.drowsy_ema = value
+        else:
+            self.drowsy_ema += self.ema_alpha * (value - self.drowsy_ema)
+        self.drowsy.append(value)
+        self.confidence.append(confidence)
+        for drowsy_window, confidence_window in self.time_windows.values():
+            drowsy_window.append(value, now)
+            confidence_window.append(confidence, now)
+
+    def __len__(self):
+        return len(self.drowsy)
+
+    @property
+    def drowsy_ratio(self):
+        return self.drowsy.mean
+
+    @property
+    def avg_confidence(self):
+        return self.confidence.mean
+
+    def windows(self, now=None):
+        """Tỷ lệ buồn ngủ/confidence theo từng cửa sổ thời gian"""
+        now = time.monotonic() if now is None else now
+        summary = {}
+        for seconds, (drowsy_window, confidence_window) in self.time_windows.items():
+            drowsy_window.evict(now)
+            confidence_window.evict(now)
+            summary[f"{seconds:g}s"] = {
+                'drowsy_ratio': drowsy_window.mean,
+                'drowsy_time_ratio': drowsy_window.time_weighted_mean(now),
+                'confidence': confidence_window.mean,
+                'samples': len(drowsy_window),
+            }
+        return summary
+
+    def clear(self):
+        self.drowsy.clear()
+        self.confidence.clear()
+        self.drowsy_ema = 0.0
+        for drowsy_window, confidence_window in self.time_windows.values():
+            drowsy_window.clear()
+            confidence_window.clear()
@@ -1,8 +1,27 @@
 import sqlite3
+import time
+from functools import wraps
+
+from core.latency_histogram import StageLatencies
 
 DB_PATH = "app.db"
 
+# Thời gian (ms) các hàm ghi database của repository, theo tên hàm (xuất qua endpoint metrics)
+write_latency = StageLatencies(stages=())
+
 def get_connection():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row  
     return conn
+
+
+def timed_write(func):
+    """Decorator đo thời gian một hàm ghi database của repository"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            write_latency.record(func.__name__, (time.perf_counter() - start) * 1000)
+    return wrapper
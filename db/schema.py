@@ -70,10 +70,33 @@ def create_tables():
             imageURL TEXT,
             datasetID INTEGER,
             createdAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+            frameSeq INTEGER,
+            captureTime REAL,
             FOREIGN KEY (drowsyVideoID) REFERENCES DrowsyVideo(ID),
             FOREIGN KEY (datasetID) REFERENCES Dataset(ID)
         )
         """)
 
+        migrate_tables(cursor)
+
         conn.commit()
         print("✅ All tables created successfully.")
+
+
+# Các cột được thêm sau khi database đã tồn tại: {bảng: [(tên cột, kiểu)]}
+ADDED_COLUMNS = {
+    "Frame": [
+        ("frameSeq", "INTEGER"),
+        ("captureTime", "REAL"),
+    ],
+}
+
+
+def migrate_tables(cursor):
+    """Thêm các cột mới vào database cũ (CREATE TABLE IF NOT EXISTS không tự thêm cột)."""
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        for column, column_type in columns:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                print(f"🛠️ Đã thêm cột {table}.{column}")
@@ -4,16 +4,24 @@ import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# Đo thời gian khởi động (--profile-startup / DROWSY_PROFILE_STARTUP), bật trước mọi import nặng
+from utils.startup_profiler import startup_profiler
+startup_profiler.enable_from_env()
+
 os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
 os.environ['QT_LOGGING_RULES'] = '*.debug=false;qt.qpa.*=false'
 
 from PyQt5.QtWidgets import QApplication, QMainWindow, QStackedWidget
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from views.LoginView import LoginView
 from views.register_view import RegisterView
 from views.DashboardView import DashboardView
 from utils.sound_manager import cleanup_sound_manager
 from services.session_service import SessionService
+from db.schema import create_tables
+import core.model_cache as model_cache
+import core.config as config
+from utils.model_preloader import ModelPreloader
 
 
 class MainWindow(QMainWindow):
@@ -37,12 +45,33 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.stacked_widget)
 
         # Initialize only essential views
-        self.init_essential_views()
+        with startup_profiler.section("init_essential_views"):
+            self.init_essential_views()
 
         # Lazy-loaded views
         self.statistics_view = None
         self.video_review_view = None
 
+        # Import thư viện suy luận + nạp model trong nền khi đang ở màn hình đăng nhập
+        self.model_preloader = ModelPreloader()
+        self.model_preloader.state_changed.connect(self.login_view.set_model_status)
+        self.model_preloader.state_changed.connect(self.dashboard_view.set_model_status)
+        if startup_profiler.enabled:
+            self.model_preloader.state_changed.connect(self._write_startup_report)
+        self.model_preloader.start(ModelPreloader.resolve_model_path())
+
+        # Endpoint metrics Prometheus (tùy chọn, metrics.prometheus_port trong config.json)
+        self.metrics_server = None
+        metrics_config = config.config.get("metrics", {})
+        if metrics_config.get("prometheus_port"):
+            from core.metrics_server import MetricsServer
+            try:
+                self.metrics_server = MetricsServer(self.dashboard_view.active_detectors,
+                                                    metrics_config.get("prometheus_host", "127.0.0.1"),
+                                                    metrics_config["prometheus_port"]).start()
+            except OSError as e:
+                print(f"⚠️ Không mở được endpoint metrics: {e}")
+
         # Show login
         self.show_login()
 
@@ -75,13 +104,23 @@ class MainWindow(QMainWindow):
 
         print("✅ Views cơ bản đã sẵn sàng")
 
+    def _write_startup_report(self, state, message):
+        """
+        Ghi báo cáo khởi động khi model nạp xong (báo cáo được ghi lại lần nữa khi thoát).
+        Khởi động kết thúc ở đây nên gỡ bộ đo import, các import lười về sau không bị tính vào báo cáo
+        """
+        if state != 'loading':
+            startup_profiler.stop_import_timing()
+            startup_profiler.write_report()
+
     def _ensure_statistics_view(self):
         """Lazy load statistics view"""
         if self.statistics_view is None:
             print("📊 Đang tải Statistics View...")
             try:
-                from views.statistics_view import StatisticsView
-                self.statistics_view = StatisticsView()
+                with startup_profiler.section("_ensure_statistics_view"):
+                    from views.statistics_view import StatisticsView
+                    self.statistics_view = StatisticsView()
                 self.statistics_view.back_signal.connect(self.show_dashboard_from_stats)
                 self.stacked_widget.addWidget(self.statistics_view)
                 print("✅ Statistics View đã sẵn sàng")
@@ -97,8 +136,9 @@ class MainWindow(QMainWindow):
         if self.video_review_view is None:
             print("🎬 Đang tải Video Review View...")
             try:
-                from views.video_review_view import VideoReviewView
-                self.video_review_view = VideoReviewView()
+                with startup_profiler.section("_ensure_video_review_view"):
+                    from views.video_review_view import VideoReviewView
+                    self.video_review_view = VideoReviewView()
                 self.video_review_view.back_signal.connect(self.show_dashboard_from_videos)
                 self.stacked_widget.addWidget(self.video_review_view)
                 print("✅ Video Review View đã sẵn sàng")
@@ -135,6 +175,10 @@ class MainWindow(QMainWindow):
         # Gửi user + session sang DashboardView
         self.dashboard_view.set_user_info(user_info)
         self.dashboard_view.set_session_info(self.current_session_id)
+        # Weight đang chọn của người dùng (dùng lại từ cache nếu trùng model đã nạp lúc khởi động)
+        model_path = ModelPreloader.resolve_model_path(user_info["id"]) or self.dashboard_view.model_path
+        self.dashboard_view.model_path = model_path
+        self.model_preloader.start(model_path)
 
         self.stacked_widget.setCurrentWidget(self.dashboard_view)
         self.setWindowTitle(f"Dashboard - {user_info['full_name']}")
@@ -199,6 +243,12 @@ class MainWindow(QMainWindow):
             print("🔇 Đang dừng âm thanh...")
             cleanup_sound_manager()
 
+            # Giải phóng model trong cache
+            model_cache.clear()
+
+            if self.metrics_server:
+                self.metrics_server.stop()
+
             # Đóng database
             # print("💾 Đang đóng database...")
             # self.db.close()
@@ -227,10 +277,20 @@ def main():
     print()
 
     try:
-        window = MainWindow()
+        # Tạo bảng/cột còn thiếu trong database
+        with startup_profiler.section("create_tables"):
+            create_tables()
+
+        with startup_profiler.section("MainWindow"):
+            window = MainWindow()
         window.show()
+        startup_profiler.mark("import + khởi tạo xong")
+        # Mốc lúc vòng lặp sự kiện chạy lần đầu (cửa sổ đã vẽ)
+        QTimer.singleShot(0, lambda: startup_profiler.mark("cửa sổ hiển thị"))
 
         exit_code = app.exec_()
+        startup_profiler.stop_import_timing()
+        startup_profiler.write_report()
 
         print("\n" + "=" * 60)
         cleanup_sound_manager()
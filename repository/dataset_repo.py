@@ -1,6 +1,7 @@
-from db.db import get_connection
+from db.db import get_connection, timed_write
 from datetime import datetime
 
+@timed_write
 def create_dataset(user_id: int, frame_limit: int, expires_at: datetime = None):
     """Create a new dataset for a user."""
     with get_connection() as conn:
@@ -23,6 +24,7 @@ def get_active_dataset(user_id: int):
         """, (user_id,))
         return cursor.fetchone()
 
+@timed_write
 def mark_dataset_used(dataset_id: int):
     """Mark a dataset as used."""
     with get_connection() as conn:
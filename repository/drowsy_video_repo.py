@@ -1,7 +1,8 @@
-from db.db import get_connection
+from db.db import get_connection, timed_write
 from datetime import datetime
 import sqlite3
 
+@timed_write
 def insert_drowsy_video(session_id: int, start_time: datetime, end_time: datetime = None):
     # Định dạng ngày tháng là YYYY-MM-DDTHH:MM:SS
     try:
@@ -30,6 +31,7 @@ def insert_drowsy_video(session_id: int, start_time: datetime, end_time: datetim
             conn.rollback()
         return None
 
+@timed_write
 def update_user_choice_by_start_time(start_time: str, user_choice: bool):
     """
     Cập nhật trường userChoiceLabel trong bảng DrowsyVideo
@@ -61,6 +63,7 @@ def update_user_choice_by_start_time(start_time: str, user_choice: bool):
             conn.rollback()
         return 0
 
+@timed_write
 def create_drowsy_video(session_id: int, start_time: datetime, end_time: datetime):
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -83,3 +86,51 @@ def get_drowsy_video_by_start_time(start_time: str):
         """, (start_time,))
         return cursor.fetchone()
 
+
+@timed_write
+def insert_analyzed_session(user_id: int, session_start: datetime, session_end: datetime, videos: list,
+                            replace_session_id: int = None):
+    """
+    Ghi kết quả phân tích một video ghi sẵn vào database trong một transaction duy nhất:
+    một Session, mỗi khoảng cảnh báo một DrowsyVideo và toàn bộ Frame của chúng (chèn hàng loạt).
+
+    Args:
+        videos: list (start_time, end_time, frames) với start_time/end_time dạng 'YYYYMMDD_HHMMSS',
+                frames là list (confidence, prediction, image_path, frame_seq, capture_time)
+        replace_session_id: Session cũ của cùng video (kèm DrowsyVideo, Frame) bị xóa trong cùng transaction
+    Returns: ID của Session, None nếu lỗi (không có bản ghi nào được ghi)
+    """
+    created_at = datetime.now().isoformat()
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            if replace_session_id is not None:
+                cursor.execute("""
+                    DELETE FROM Frame
+                    WHERE drowsyVideoID IN (SELECT ID FROM DrowsyVideo WHERE sessionID = ?)
+                """, (replace_session_id,))
+                cursor.execute("DELETE FROM DrowsyVideo WHERE sessionID = ?", (replace_session_id,))
+                cursor.execute("DELETE FROM Session WHERE ID = ?", (replace_session_id,))
+            cursor.execute("""
+                INSERT INTO Session (userID, startTime, endTime)
+                VALUES (?, ?, ?)
+            """, (user_id, session_start.isoformat(), session_end.isoformat()))
+            session_id = cursor.lastrowid
+
+            for start_time, end_time, frames in videos:
+                cursor.execute("""
+                    INSERT INTO DrowsyVideo (sessionID, startTime, endTime, userChoiceLabel)
+                    VALUES (?, ?, ?, NULL)
+                """, (session_id, start_time, end_time))
+                video_id = cursor.lastrowid
+                cursor.executemany("""
+                    INSERT INTO Frame (drowsyVideoID, confidenceScore, modelPrediction, imageURL, datasetID,
+                                       createdAt, frameSeq, captureTime)
+                    VALUES (?, ?, ?, ?, NULL, ?, ?, ?)
+                """, [(video_id, confidence, prediction, image_path, created_at, frame_seq, capture_time)
+                      for confidence, prediction, image_path, frame_seq, capture_time in frames])
+            return session_id
+
+    except sqlite3.Error as e:
+        print(f"❌ Lỗi database khi ghi kết quả phân tích: {e}")
+        return None
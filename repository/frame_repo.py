@@ -1,14 +1,21 @@
-from db.db import get_connection
+from db.db import get_connection, timed_write
 from datetime import datetime
 
-def insert_frame(drowsy_video_id: int, confidence: float, prediction: bool, image_path: str):
-    """Insert a frame into the Frame table (datasetID luôn NULL)."""
+@timed_write
+def insert_frame(drowsy_video_id: int, confidence: float, prediction: bool, image_path: str,
+                 frame_seq: int = None, capture_time: float = None):
+    """Insert a frame into the Frame table (datasetID luôn NULL).
+
+    frame_seq là số thứ tự frame từ camera, capture_time là thời điểm chụp (epoch, giây).
+    """
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO Frame (drowsyVideoID, confidenceScore, modelPrediction, imageURL, datasetID, createdAt)
-            VALUES (?, ?, ?, ?, NULL, ?)
-        """, (drowsy_video_id, confidence, prediction, image_path, datetime.now().isoformat()))
+            INSERT INTO Frame (drowsyVideoID, confidenceScore, modelPrediction, imageURL, datasetID, createdAt,
+                               frameSeq, captureTime)
+            VALUES (?, ?, ?, ?, NULL, ?, ?, ?)
+        """, (drowsy_video_id, confidence, prediction, image_path, datetime.now().isoformat(),
+              frame_seq, capture_time))
         conn.commit()
         return cursor.lastrowid
 
@@ -16,13 +23,14 @@ def get_frames_by_video(video_id: int):
     """Retrieve all frames for a given video."""
     with get_connection() as conn:
         cursor = conn.execute("""
-            SELECT ID, confidenceScore, modelPrediction, imageURL, createdAt
+            SELECT ID, confidenceScore, modelPrediction, imageURL, createdAt, frameSeq, captureTime
             FROM Frame
             WHERE drowsyVideoID = ?
-            ORDER BY createdAt ASC
+            ORDER BY createdAt ASC, frameSeq ASC
         """, (video_id,))
         return cursor.fetchall()
 
+@timed_write
 def delete_frames_by_video(video_id: int):
     """Delete all frames for a given video."""
     with get_connection() as conn:
@@ -41,6 +49,7 @@ def get_high_confidence_frames(drowsy_video_id: int, threshold: float = 0.7):
         """, (drowsy_video_id, threshold))
         return cursor.fetchall()
 
+@timed_write
 def insert_frame_to_dataset(frame, dataset_id: int):
     """Chèn frame vào dataset (tạo bản sao của frame với datasetID mới)."""
     with get_connection() as conn:
@@ -55,3 +64,28 @@ def insert_frame_to_dataset(frame, dataset_id: int):
             dataset_id
         ))
         conn.commit()
+
+def get_frame_image_paths(limit: int = None):
+    """Lấy đường dẫn ảnh của các frame đã lưu (mới nhất trước)."""
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            SELECT imageURL
+            FROM Frame
+            WHERE imageURL IS NOT NULL
+            ORDER BY ID DESC
+            LIMIT ?
+        """, (limit if limit is not None else -1,))
+        return [row["imageURL"] for row in cursor.fetchall()]
+
+def get_labeled_frames(limit: int = None):
+    """Lấy các frame thuộc video đã được người dùng xác nhận nhãn (userChoiceLabel)."""
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            SELECT Frame.ID, Frame.imageURL, Frame.modelPrediction, DrowsyVideo.userChoiceLabel
+            FROM Frame
+            JOIN DrowsyVideo ON Frame.drowsyVideoID = DrowsyVideo.ID
+            WHERE DrowsyVideo.userChoiceLabel IS NOT NULL AND Frame.imageURL IS NOT NULL
+            ORDER BY Frame.ID DESC
+            LIMIT ?
+        """, (limit if limit is not None else -1,))
+        return cursor.fetchall()
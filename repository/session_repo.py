@@ -1,6 +1,7 @@
-from db.db import get_connection
+from db.db import get_connection, timed_write
 from datetime import datetime
 
+@timed_write
 def create_session(user_id: int):
     """Create a new session for a user."""
     with get_connection() as conn:
@@ -12,6 +13,7 @@ def create_session(user_id: int):
         conn.commit()
         return cursor.lastrowid
 
+@timed_write
 def end_session(session_id: int):
     """End a session."""
     with get_connection() as conn:
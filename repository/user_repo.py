@@ -1,5 +1,5 @@
 # repository/user_repo.py
-from db.db import get_connection
+from db.db import get_connection, timed_write
 import hashlib
 
 def hash_password(password: str) -> str:
@@ -19,6 +19,7 @@ def email_exists(email: str) -> bool:
         return cur.fetchone() is not None
 
 
+@timed_write
 def insert_user(full_name: str, username: str, password_hash: str, email: str, phone: str):
     with get_connection() as conn:
         conn.execute("""
@@ -1,5 +1,6 @@
-from db.db import get_connection
+from db.db import get_connection, timed_write
 
+@timed_write
 def insert_weight(user_id: int, dataset_id: int = None, storage_url: str = None, is_currently_use: bool = False):
     with get_connection() as conn:
         conn.execute("""
@@ -37,6 +38,7 @@ def get_current_weight(user_id: int):
         return dict(zip([c[0] for c in cur.description], row))
 
 
+@timed_write
 def update_current_weight(user_id: int, weight_id: int):
     with get_connection() as conn:
         conn.execute("""
@@ -54,6 +56,7 @@ def update_current_weight(user_id: int, weight_id: int):
         conn.commit()
 
 
+@timed_write
 def delete_weight(weight_id: int):
     with get_connection() as conn:
         conn.execute("DELETE FROM Weight WHERE ID = ?", (weight_id,))
@@ -0,0 +1,206 @@
+"""
+Phân tích buồn ngủ trên video ghi sẵn không cần giao diện: phân loại từng frame theo batch,
+chạy luật cảnh báo của detector và ghi kết quả ra SQLite và/hoặc CSV.
+
+Cách dùng (chạy từ thư mục gốc của project):
+    python -m tools.analyze_videos dashcam/ --workers 4 --db offline_results.db
+    python -m tools.analyze_videos drive1.mp4 drive2.mp4 --stride 2 --csv-dir results/
+"""
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+
+import core.config as config
+import core.offline_analysis as offline
+from core.offline_analysis import analyze_video, find_videos, init_worker, worker_inference_config
+
+
+def analyze_task(task):
+    """Chạy trong worker: phân tích một video, lỗi được trả về thay vì làm hỏng cả pool"""
+    path, batch_size, stride, alert_threshold = task
+    try:
+        info, predictions, intervals = analyze_video(offline.worker_backend, path, batch_size, stride,
+                                                     alert_threshold, offline.worker_face_cropper)
+        return path, info, predictions, intervals, None
+    except Exception as e:
+        return path, None, None, None, str(e)
+
+
+class SqliteResultWriter:
+    """Ghi kết quả vào file SQLite riêng (không phải app.db), mỗi video một transaction"""
+
+    def __init__(self, db_path, model_path):
+        self.model_path = model_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS AnalyzedVideo (
+                ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT UNIQUE NOT NULL,
+                fps REAL,
+                frameCount INTEGER,
+                analyzedFrames INTEGER,
+                elapsedSec REAL,
+                modelPath TEXT,
+                createdAt DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS FramePrediction (
+                ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                analyzedVideoID INTEGER NOT NULL,
+                frameIdx INTEGER,
+                timestampSec REAL,
+                classID INTEGER,
+                className TEXT,
+                confidence REAL,
+                isDrowsy BOOLEAN,
+                FOREIGN KEY (analyzedVideoID) REFERENCES AnalyzedVideo(ID)
+            );
+            CREATE TABLE IF NOT EXISTS AlertInterval (
+                ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                analyzedVideoID INTEGER NOT NULL,
+                startSec REAL,
+                endSec REAL,
+                startFrame INTEGER,
+                endFrame INTEGER,
+                alertCount INTEGER,
+                peakRatio REAL,
+                avgConfidence REAL,
+                FOREIGN KEY (analyzedVideoID) REFERENCES AnalyzedVideo(ID)
+            );
+            CREATE INDEX IF NOT EXISTS idx_frame_prediction_video ON FramePrediction(analyzedVideoID, frameIdx);
+        """)
+
+    def write(self, path, info, predictions, intervals):
+        with self.conn:
+            # Phân tích lại cùng video thì thay kết quả cũ
+            row = self.conn.execute("SELECT ID FROM AnalyzedVideo WHERE path = ?", (path,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM FramePrediction WHERE analyzedVideoID = ?", row)
+                self.conn.execute("DELETE FROM AlertInterval WHERE analyzedVideoID = ?", row)
+                self.conn.execute("DELETE FROM AnalyzedVideo WHERE ID = ?", row)
+            cursor = self.conn.execute("""
+                INSERT INTO AnalyzedVideo (path, fps, frameCount, analyzedFrames, elapsedSec, modelPath)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (path, info['fps'], info['frame_count'], info['analyzed_frames'], info['elapsed'], self.model_path))
+            video_id = cursor.lastrowid
+            self.conn.executemany("""
+                INSERT INTO FramePrediction (analyzedVideoID, frameIdx, timestampSec, classID, className,
+                                             confidence, isDrowsy)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, ((video_id, *prediction) for prediction in predictions))
+            self.conn.executemany("""
+                INSERT INTO AlertInterval (analyzedVideoID, startSec, endSec, startFrame, endFrame, alertCount,
+                                           peakRatio, avgConfidence)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, ((video_id, *interval) for interval in intervals))
+
+    def close(self):
+        self.conn.close()
+
+
+class CsvResultWriter:
+    """Ghi kết quả ra frames.csv và alerts.csv (cột đầu là đường dẫn video)"""
+
+    FRAME_HEADER = ['video', 'frame_idx', 'timestamp', 'class_id', 'class_name', 'confidence', 'is_drowsy']
+    ALERT_HEADER = ['video', 'start_time', 'end_time', 'start_frame', 'end_frame', 'alert_count', 'peak_ratio',
+                    'avg_confidence']
+
+    def __init__(self, csv_dir):
+        os.makedirs(csv_dir, exist_ok=True)
+        self.frames_file = open(os.path.join(csv_dir, 'frames.csv'), 'w', newline='')
+        self.alerts_file = open(os.path.join(csv_dir, 'alerts.csv'), 'w', newline='')
+        self.frames_writer = csv.writer(self.frames_file)
+        self.alerts_writer = csv.writer(self.alerts_file)
+        self.frames_writer.writerow(self.FRAME_HEADER)
+        self.alerts_writer.writerow(self.ALERT_HEADER)
+
+    def write(self, path, info, predictions, intervals):
+        self.frames_writer.writerows((path, *prediction) for prediction in predictions)
+        self.alerts_writer.writerows((path, *interval) for interval in intervals)
+        self.frames_file.flush()
+        self.alerts_file.flush()
+
+    def close(self):
+        self.frames_file.close()
+        self.alerts_file.close()
+
+
+def run(videos, model_path, workers, batch_size, stride, alert_threshold, writers):
+    """Phân tích các video (song song theo file khi workers > 1) và ghi kết quả ngay khi xong từng video"""
+    inference_config = worker_inference_config(config.config.get('inference', {}), workers)
+    face_roi_config = config.config.get('face_roi', {})
+    tasks = [(path, batch_size, stride, alert_threshold) for path in videos]
+
+    if workers > 1:
+        # spawn: mỗi worker nạp model riêng, không kế thừa trạng thái của process chính
+        pool = mp.get_context('spawn').Pool(workers, initializer=init_worker,
+                                            initargs=(model_path, inference_config, face_roi_config))
+        results = pool.imap_unordered(analyze_task, tasks)
+    else:
+        pool = None
+        init_worker(model_path, inference_config, face_roi_config)
+        results = map(analyze_task, tasks)
+
+    start = time.perf_counter()
+    total_frames = 0
+    failed = []
+    try:
+        for done, (path, info, predictions, intervals, error) in enumerate(results, 1):
+            if error:
+                failed.append(path)
+                print(f"❌ [{done}/{len(tasks)}] {path}: {error}")
+                continue
+            for writer in writers:
+                writer.write(path, info, predictions, intervals)
+            total_frames += info['analyzed_frames']
+            print(f"✅ [{done}/{len(tasks)}] {path}: {info['analyzed_frames']} frame, {len(intervals)} khoảng cảnh báo "
+                  f"({info['analyzed_frames'] / info['elapsed'] if info['elapsed'] > 0 else 0:.1f} FPS)")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"📊 {len(tasks) - len(failed)}/{len(tasks)} video, {total_frames} frame trong {elapsed:.1f}s "
+          f"({total_frames / elapsed if elapsed > 0 else 0:.1f} FPS)")
+    return failed
+
+
+def main():
+    detector_config = config.config.get('detector', {})
+    parser = argparse.ArgumentParser(description="Phân tích buồn ngủ trên video ghi sẵn (không giao diện)")
+    parser.add_argument('inputs', nargs='+', help="file video hoặc thư mục chứa video")
+    parser.add_argument('--model', default=config.config.get('model_path', 'core/best.pt'))
+    parser.add_argument('--workers', type=int, default=1, help="số process phân tích song song (mỗi process một model)")
+    parser.add_argument('--batch-size', type=int, default=detector_config.get('batch_size', 4))
+    parser.add_argument('--stride', type=int, default=1, help="chỉ phân loại 1 frame mỗi N frame")
+    parser.add_argument('--alert-threshold', type=float, default=3,
+                        help="số giây buồn ngủ liên tục trước khi cảnh báo")
+    parser.add_argument('--db', default=None, help="file SQLite kết quả (mặc định offline_results.db)")
+    parser.add_argument('--csv-dir', default=None, help="thư mục ghi frames.csv và alerts.csv")
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("❌ Không tìm thấy video nào")
+        return
+
+    writers = []
+    if args.db or not args.csv_dir:
+        writers.append(SqliteResultWriter(args.db or 'offline_results.db', args.model))
+    if args.csv_dir:
+        writers.append(CsvResultWriter(args.csv_dir))
+
+    print(f"🎬 {len(videos)} video, {args.workers} worker, batch {args.batch_size}, stride {args.stride}")
+    try:
+        run(videos, args.model, max(1, args.workers), args.batch_size, max(1, args.stride), args.alert_threshold,
+            writers)
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Phân tích song song cả thư mục video bằng pool process và ghi kết quả vào app.db.
+
+Mỗi video được chia thành các đoạn frame (chunk) giải mã độc lập; mọi chunk của mọi video nằm chung một hàng đợi,
+worker rảnh lấy chunk kế tiếp nên không có worker nào ngồi chờ khi video dài ngắn khác nhau. Kết quả từng chunk
+được lưu vào thư mục làm việc cùng manifest tiến độ, chạy lại lệnh sẽ tiếp tục từ chỗ dừng. Khi đủ chunk của một
+video, luật cảnh báo được chạy lại theo thứ tự và kết quả (Session, DrowsyVideo, Frame) được ghi vào app.db trong
+một transaction.
+
+Cách dùng (chạy từ thư mục gốc của project):
+    python -m tools.batch_analyze dashcam/ --user-id 1 --workers 8
+    python -m tools.batch_analyze dashcam/ --user-id 1 --stride 2 --no-images
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from datetime import datetime, timedelta
+from hashlib import sha1
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import core.config as config
+import core.offline_analysis as offline
+import repository.drowsy_video_repo as drowsy_video_repo
+from core.offline_analysis import (FramePrediction, detect_alert_intervals, find_videos, init_worker,
+                                   predict_frames, video_info, worker_inference_config)
+from db.schema import create_tables
+
+
+class ProgressManifest:
+    """
+    Manifest tiến độ (manifest.json trong thư mục làm việc): chunk nào đã xong, video nào đã ghi vào app.db.
+    Chỉ process chính đọc/ghi; mỗi lần ghi thay file nguyên khối nên không hỏng khi bị ngắt giữa chừng.
+    """
+
+    def __init__(self, work_dir, settings):
+        self.work_dir = Path(work_dir)
+        self.chunk_dir = self.work_dir / 'chunks'
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.work_dir / 'manifest.json'
+        self.data = {'settings': settings, 'videos': {}}
+
+        if self.path.exists():
+            with open(self.path) as file:
+                saved = json.load(file)
+            if saved.get('settings') == settings:
+                self.data = saved
+            else:
+                # Đổi model/stride/kích thước chunk thì chunk dở dang không dùng lại được. Video đã ghi vào app.db
+                # được giữ nguyên (không phân tích lại để tránh tạo Session trùng)
+                merged = {path: entry for path, entry in saved.get('videos', {}).items() if entry.get('merged')}
+                print(f"⚠️ Cấu hình khác lần chạy trước, phân tích lại các video chưa xong "
+                      f"(giữ {len(merged)} video đã ghi vào app.db)")
+                self.data['videos'] = merged
+                for chunk_file in self.chunk_dir.glob('*.npz'):
+                    chunk_file.unlink()
+
+    def video(self, path, chunk_frames, stride):
+        """
+        Lấy (hoặc tạo mới khi file video đã thay đổi) mục của một video. Video đã ghi vào app.db mà file thay đổi
+        được phân tích lại, Session cũ (replaces_session_id) bị thay thế khi ghi kết quả mới
+        """
+        stat = os.stat(path)
+        entry = self.data['videos'].get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return entry
+        replaces_session_id = None
+        if entry:
+            replaces_session_id = entry['session_id'] if entry['merged'] else entry.get('replaces_session_id')
+            for chunk_idx in range(len(entry['chunks'])):
+                self.chunk_file(entry, chunk_idx).unlink(missing_ok=True)
+
+        info = video_info(path)
+        frame_count = info['frame_count']
+        # Ranh giới chunk là bội số của stride để frame được lấy giống hệt khi đọc cả video
+        chunk_frames = max(stride, chunk_frames // stride * stride)
+        starts = list(range(0, frame_count, chunk_frames)) if frame_count > 0 else [0]
+        entry = {
+            'key': sha1(os.path.abspath(path).encode()).hexdigest()[:12],
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'fps': info['fps'],
+            'frame_count': frame_count,
+            # Chunk cuối không giới hạn để không mất frame khi CAP_PROP_FRAME_COUNT không chính xác
+            'chunks': [[start, starts[i + 1] if i + 1 < len(starts) else None] for i, start in enumerate(starts)],
+            'done': [],
+            'merged': False,
+            'session_id': None,
+            'replaces_session_id': replaces_session_id,
+        }
+        self.data['videos'][path] = entry
+        return entry
+
+    def chunk_file(self, entry, chunk_idx):
+        return self.chunk_dir / f"{entry['key']}_{chunk_idx:05d}.npz"
+
+    def save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as file:
+            json.dump(self.data, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def predict_chunk(task):
+    """Chạy trong worker: phân loại một đoạn frame, lỗi được trả về thay vì làm hỏng cả pool"""
+    path, chunk_idx, start_frame, end_frame, fps, batch_size, stride = task
+    started = time.perf_counter()
+    try:
+        if offline.worker_face_cropper is not None:
+            offline.worker_face_cropper.reset()
+        predictions = predict_frames(offline.worker_backend, path, fps, batch_size, stride, start_frame, end_frame,
+                                     offline.worker_face_cropper)
+        return path, chunk_idx, predictions, time.perf_counter() - started, None
+    except Exception as e:
+        return path, chunk_idx, None, time.perf_counter() - started, str(e)
+
+
+def save_chunk(chunk_file, predictions):
+    np.savez(chunk_file,
+             frame_idx=np.array([p.frame_idx for p in predictions], dtype=np.int64),
+             class_id=np.array([p.class_id for p in predictions], dtype=np.int16),
+             class_name=np.array([p.class_name for p in predictions], dtype=str),
+             confidence=np.array([p.confidence for p in predictions], dtype=np.float64))
+
+
+def load_predictions(manifest, entry):
+    """Ghép kết quả các chunk của một video theo thứ tự frame"""
+    predictions = []
+    for chunk_idx in range(len(entry['chunks'])):
+        data = np.load(manifest.chunk_file(entry, chunk_idx))
+        for frame_idx, class_id, class_name, confidence in zip(data['frame_idx'], data['class_id'],
+                                                               data['class_name'], data['confidence']):
+            class_name = str(class_name)
+            predictions.append(FramePrediction(int(frame_idx), int(frame_idx) / entry['fps'], int(class_id),
+                                               class_name, float(confidence), class_name.lower() == 'drowsy'))
+    return predictions
+
+
+def save_clip_images(path, image_paths):
+    """Trích các frame cần lưu ảnh từ video: image_paths là {frame_idx: đường dẫn ảnh}, đọc tuần tự từ frame nhỏ nhất"""
+    if not image_paths:
+        return
+    cap = cv2.VideoCapture(path)
+    try:
+        first, last = min(image_paths), max(image_paths)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        for frame_idx in range(first, last + 1):
+            if frame_idx not in image_paths:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            cv2.imwrite(image_paths[frame_idx], frame)
+    finally:
+        cap.release()
+
+
+def merge_video(path, entry, manifest, args):
+    """Chạy luật cảnh báo trên kết quả đủ chunk của video và ghi vào app.db"""
+    predictions = load_predictions(manifest, entry)
+    intervals = detect_alert_intervals(predictions, entry['fps'] / args.stride, args.alert_threshold)
+
+    # Thời điểm bắt đầu ghi hình ước lượng từ thời điểm sửa file trừ độ dài video
+    duration = max(entry['frame_count'] / entry['fps'], predictions[-1].timestamp if predictions else 0.0)
+    video_start = datetime.fromtimestamp(entry['mtime'] - duration)
+    drowsy_path = config.config.get('drowsy_image_path', 'drowsy_images')
+
+    videos = []
+    for interval in intervals:
+        clip = [p for p in predictions if interval.start_frame <= p.frame_idx <= interval.end_frame]
+        # Giữ tối đa clip_frames frame trải đều trong khoảng cảnh báo, giống độ dài video cảnh báo khi chạy realtime
+        if len(clip) > args.clip_frames:
+            clip = [clip[i] for i in np.linspace(0, len(clip) - 1, args.clip_frames).astype(int)]
+        start_id = (video_start + timedelta(seconds=interval.start_time)).strftime("%Y%m%d_%H%M%S")
+        end_id = (video_start + timedelta(seconds=interval.end_time)).strftime("%Y%m%d_%H%M%S")
+
+        clip_dir = os.path.join(drowsy_path, f"offline_{Path(path).stem}_{start_id}")
+        image_paths = {}
+        frames = []
+        for p in clip:
+            capture_time = video_start.timestamp() + p.timestamp
+            image_path = None
+            if args.save_images:
+                image_path = (f"{clip_dir}/frame_idx={p.frame_idx}_ts={capture_time:.3f}"
+                              f"_confidence={p.confidence}_class={p.class_name}.jpg")
+                image_paths[p.frame_idx] = image_path
+            frames.append((p.confidence, p.is_drowsy, image_path, p.frame_idx, capture_time))
+        if image_paths:
+            os.makedirs(clip_dir, exist_ok=True)
+            save_clip_images(path, image_paths)
+        videos.append((start_id, end_id, frames))
+
+    session_id = drowsy_video_repo.insert_analyzed_session(args.user_id, video_start,
+                                                           video_start + timedelta(seconds=duration), videos,
+                                                           replace_session_id=entry.get('replaces_session_id'))
+    if session_id is None:
+        return False
+
+    entry['merged'] = True
+    entry['session_id'] = session_id
+    entry['replaces_session_id'] = None
+    manifest.save()
+    for chunk_idx in range(len(entry['chunks'])):
+        manifest.chunk_file(entry, chunk_idx).unlink(missing_ok=True)
+    print(f"💾 {path}: {len(predictions)} frame, {len(intervals)} khoảng cảnh báo -> Session {session_id}")
+    return True
+
+
+def main():
+    detector_config = config.config.get('detector', {})
+    parser = argparse.ArgumentParser(description="Phân tích song song thư mục video và ghi kết quả vào app.db")
+    parser.add_argument('inputs', nargs='+', help="file video hoặc thư mục chứa video")
+    parser.add_argument('--user-id', type=int, required=True, help="người dùng sở hữu các Session được tạo")
+    parser.add_argument('--model', default=config.config.get('model_path', 'core/best.pt'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="số process phân tích (mỗi process một model)")
+    parser.add_argument('--chunk-frames', type=int, default=1800, help="số frame mỗi chunk giải mã")
+    parser.add_argument('--batch-size', type=int, default=detector_config.get('batch_size', 4))
+    parser.add_argument('--stride', type=int, default=1, help="chỉ phân loại 1 frame mỗi N frame")
+    parser.add_argument('--alert-threshold', type=float, default=3,
+                        help="số giây buồn ngủ liên tục trước khi cảnh báo")
+    parser.add_argument('--clip-frames', type=int, default=90, help="số frame tối đa lưu cho mỗi khoảng cảnh báo")
+    parser.add_argument('--no-images', dest='save_images', action='store_false',
+                        help="không trích ảnh frame (Frame.imageURL để trống)")
+    parser.add_argument('--work-dir', default='.batch_analysis', help="thư mục manifest và kết quả từng chunk")
+    args = parser.parse_args()
+    args.stride = max(1, args.stride)
+    workers = max(1, args.workers)
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("❌ Không tìm thấy video nào")
+        return
+    create_tables()
+
+    manifest = ProgressManifest(args.work_dir, {'model': os.path.abspath(args.model), 'stride': args.stride,
+                                                'chunk_frames': args.chunk_frames})
+    entries = {}
+    for path in videos:
+        try:
+            entries[path] = manifest.video(path, args.chunk_frames, args.stride)
+        except Exception as e:
+            print(f"❌ {path}: {e}")
+    manifest.save()
+
+    # Video đã phân loại xong ở lần chạy trước nhưng chưa ghi vào app.db
+    for path, entry in entries.items():
+        if not entry['merged'] and len(entry['done']) == len(entry['chunks']):
+            merge_video(path, entry, manifest, args)
+
+    # Video dài trước để chunk của chúng không dồn về cuối hàng đợi
+    pending = sorted((entry for entry in entries.items() if not entry[1]['merged']),
+                     key=lambda item: -item[1]['frame_count'])
+    tasks = [(path, chunk_idx, start, end, entry['fps'], args.batch_size, args.stride)
+             for path, entry in pending
+             for chunk_idx, (start, end) in enumerate(entry['chunks']) if chunk_idx not in entry['done']]
+    merged = sum(entry['merged'] for entry in entries.values())
+    print(f"🎬 {len(entries)} video ({merged} đã xong), {len(tasks)} chunk cần xử lý, {workers} worker")
+    if not tasks:
+        return
+
+    inference_config = worker_inference_config(config.config.get('inference', {}), workers)
+    init_args = (args.model, inference_config, config.config.get('face_roi', {}))
+    if workers > 1:
+        # spawn: mỗi worker nạp model riêng; chunksize=1 để worker rảnh lấy ngay chunk kế tiếp
+        pool = mp.get_context('spawn').Pool(workers, initializer=init_worker, initargs=init_args)
+        results = pool.imap_unordered(predict_chunk, tasks, chunksize=1)
+    else:
+        pool = None
+        init_worker(*init_args)
+        results = map(predict_chunk, tasks)
+
+    start = time.perf_counter()
+    total_frames = 0
+    try:
+        for done, (path, chunk_idx, predictions, elapsed, error) in enumerate(results, 1):
+            if error:
+                print(f"❌ [{done}/{len(tasks)}] {path} chunk {chunk_idx}: {error}")
+                continue
+            entry = entries[path]
+            save_chunk(manifest.chunk_file(entry, chunk_idx), predictions)
+            entry['done'].append(chunk_idx)
+            manifest.save()
+
+            total_frames += len(predictions)
+            wall = time.perf_counter() - start
+            print(f"✅ [{done}/{len(tasks)}] {path} chunk {chunk_idx}: {len(predictions)} frame "
+                  f"({len(predictions) / elapsed if elapsed > 0 else 0:.1f} FPS/worker, "
+                  f"tổng {total_frames / wall if wall > 0 else 0:.1f} FPS)")
+
+            if len(entry['done']) == len(entry['chunks']):
+                merge_video(path, entry, manifest, args)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    wall = time.perf_counter() - start
+    print(f"📊 {total_frames} frame trong {wall:.1f}s ({total_frames / wall if wall > 0 else 0:.1f} FPS)")
+
+
+if __name__ == '__main__':
+    main()
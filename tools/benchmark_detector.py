@@ -0,0 +1,107 @@
+"""
+Đo tốc độ tối đa của DrowsinessDetector không cần webcam hay giao diện (chạy được trên máy CI).
+
+Cách dùng (chạy từ thư mục gốc của project):
+    python -m tools.benchmark_detector --source synthetic --frames 600
+    python -m tools.benchmark_detector --source videos/drive.mp4
+    python -m tools.benchmark_detector --source drowsy_images --realtime --speed 2
+"""
+import argparse
+import json
+import time
+
+import core.config as config
+from core.DrowsinessDetector import DrowsinessDetector
+from core.frame_meta import FrameClock
+from utils.frame_sources import create_frame_source
+
+
+def run_benchmark(detector, source, max_frames=None, drain_timeout=30.0):
+    """
+    Đưa toàn bộ frame của nguồn qua detector và chờ xử lý xong
+    Returns: dict kết quả đo
+    """
+    clock = FrameClock()
+    submitted = 0
+    last_seq = None
+
+    start = time.perf_counter()
+    while max_frames is None or submitted < max_frames:
+        read_start = time.perf_counter()
+        ret, frame = source.read()
+        if not ret:
+            break
+        meta = clock.tag()
+        detector.latency.record('capture', (meta.capture_ts - read_start) * 1000)
+        detector.process_frame(frame, meta)
+        last_seq = meta.seq
+        submitted += 1
+    read_done = time.perf_counter()
+
+    # Chờ các frame còn trong queue được suy luận xong
+    deadline = time.perf_counter() + drain_timeout
+    while last_seq is not None and time.perf_counter() < deadline:
+        detector.poll_results()
+        if detector.current_frame_seq == last_seq:
+            break
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    metrics = detector.metrics()
+    results = metrics['frames_inferred']
+    return {
+        'source': source.kind,
+        'frames_submitted': submitted,
+        'frames_inferred': results,
+        'drained': detector.current_frame_seq == last_seq,
+        'dropped_frames': metrics['dropped_frames'],
+        'elapsed_s': elapsed,
+        'submit_fps': submitted / (read_done - start) if read_done > start else 0.0,
+        'inference_fps': results / elapsed if elapsed > 0 else 0.0,
+        **detector.batcher.stats(),
+        'batches': detector.batcher.batch_count,
+        'latency': detector.latency.snapshot(),
+    }
+
+
+def main():
+    camera_config = config.config.get('camera', {})
+    detector_config = config.config.get('detector', {})
+    parser = argparse.ArgumentParser(description="Đo tốc độ tối đa của detector với nguồn frame không cần webcam")
+    parser.add_argument('--source', default='synthetic',
+                        help='"synthetic", file video, thư mục ảnh hoặc số camera')
+    parser.add_argument('--model', default=config.config.get('model_path', 'core/best.pt'))
+    parser.add_argument('--frames', type=int, default=600, help="số frame tối đa")
+    parser.add_argument('--batch-size', type=int, default=detector_config.get('batch_size', 4))
+    parser.add_argument('--realtime', action='store_true',
+                        help="giữ nhịp theo FPS của nguồn thay vì chạy nhanh nhất có thể")
+    parser.add_argument('--speed', type=float, default=1.0, help="hệ số tốc độ phát khi --realtime")
+    parser.add_argument('--report', default=None, help="ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    source_config = {**camera_config, 'source': args.source, 'playback_speed': args.speed,
+                     'max_throughput': not args.realtime, 'synthetic_frames': args.frames}
+    source = create_frame_source(source_config)
+    if not source.isOpened():
+        print(f"❌ Không mở được nguồn: {args.source}")
+        return
+    print(f"🎞️ Nguồn {source.kind}: {source.probe()}")
+
+    # Không bỏ frame và không lưu ảnh cảnh báo khi đo
+    detector = DrowsinessDetector(args.model, batch_size=args.batch_size, queue_policy='block',
+                                  freshness_budget_ms=0, block_timeout_ms=None, save_alert_clips=False)
+    try:
+        result = run_benchmark(detector, source, args.frames)
+    finally:
+        detector.stop()
+        source.release()
+
+    print(json.dumps(result, indent=4))
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(result, file, indent=4)
+        print(f"✅ Đã ghi báo cáo: {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Lượng tử hóa model phân loại buồn ngủ sang INT8 và so sánh với model FP32.
+
+Cách dùng (chạy từ thư mục gốc của project):
+    python -m tools.quantize_model --mode static
+    python -m tools.quantize_model --mode dynamic --report quantize_report.json
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                      quantize_dynamic, quantize_static)
+
+import core.config as config
+import repository.frame_repo as frame_repo
+from core.inference_backend import OnnxBackend, export_onnx, preprocess_batch
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def collect_calibration_images(image_dir, limit):
+    """Lấy ảnh hiệu chỉnh từ bảng Frame, bổ sung từ thư mục drowsy_images nếu chưa đủ"""
+    paths = []
+    seen = set()
+    try:
+        candidates = frame_repo.get_frame_image_paths(limit)
+    except Exception as e:
+        print(f"⚠️ Không đọc được bảng Frame: {e}")
+        candidates = []
+    if image_dir and Path(image_dir).exists():
+        candidates += [str(p) for p in sorted(Path(image_dir).rglob('*')) if p.suffix.lower() in IMAGE_EXTENSIONS]
+
+    for path in candidates:
+        if len(paths) >= limit:
+            break
+        if path not in seen and Path(path).exists():
+            seen.add(path)
+            paths.append(path)
+    return paths
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """CalibrationDataReader cho onnxruntime.quantization, đọc từng ảnh đã lưu"""
+
+    def __init__(self, image_paths, input_name, imgsz):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._iter = iter(self.image_paths)
+
+    def get_next(self):
+        for path in self._iter:
+            image = cv2.imread(path)
+            if image is not None:
+                return {self.input_name: preprocess_batch([image], self.imgsz).copy()}
+        return None
+
+    def rewind(self):
+        self._iter = iter(self.image_paths)
+
+
+def quantize(fp32_path, int8_path, mode, calibration_images):
+    """Lượng tử hóa model ONNX FP32 sang INT8 (dynamic hoặc static)"""
+    if mode == 'dynamic':
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+        return
+
+    if not calibration_images:
+        raise ValueError("Không có ảnh hiệu chỉnh cho lượng tử hóa static")
+
+    fp32 = OnnxBackend(fp32_path)
+    reader = FrameCalibrationReader(calibration_images, fp32.input_name, fp32.imgsz)
+    quantize_static(fp32_path, int8_path, reader,
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8)
+
+
+def evaluate(backend, labeled_frames):
+    """Độ chính xác của backend so với nhãn người dùng xác nhận"""
+    correct = total = 0
+    predictions = {}
+    for row in labeled_frames:
+        image = cv2.imread(row["imageURL"])
+        if image is None:
+            continue
+        _, class_name, _ = backend.predict([image])[0]
+        is_drowsy = class_name.lower() == 'drowsy'
+        predictions[row["ID"]] = is_drowsy
+        correct += int(is_drowsy == bool(row["userChoiceLabel"]))
+        total += 1
+    return {
+        'frames': total,
+        'accuracy': correct / total if total else None,
+    }, predictions
+
+
+def benchmark(backend, images, batch_size, rounds):
+    """Đo số frame/giây của backend"""
+    if not images:
+        return None
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    backend.predict(batches[0])  # warmup
+
+    frames = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for batch in batches:
+            backend.predict(batch)
+            frames += len(batch)
+    elapsed = time.perf_counter() - start
+    return frames / elapsed if elapsed > 0 else None
+
+
+def main():
+    inference_config = config.config.get('inference', {})
+    parser = argparse.ArgumentParser(description="Lượng tử hóa model sang INT8 và so sánh với FP32")
+    parser.add_argument('--model', default=config.config.get('model_path', 'core/best.pt'),
+                        help="model .pt gốc")
+    parser.add_argument('--fp32', default=inference_config.get('onnx_model_path', 'core/best.onnx'),
+                        help="file ONNX FP32 (tự export nếu chưa có)")
+    parser.add_argument('--output', default=inference_config.get('int8_model_path', 'core/best.int8.onnx'),
+                        help="file ONNX INT8 đầu ra")
+    parser.add_argument('--mode', choices=['dynamic', 'static'], default='static')
+    parser.add_argument('--image-dir', default=config.config.get('drowsy_image_path', 'drowsy_images'),
+                        help="thư mục ảnh hiệu chỉnh bổ sung")
+    parser.add_argument('--calib-size', type=int, default=300, help="số ảnh hiệu chỉnh tối đa")
+    parser.add_argument('--eval-size', type=int, default=2000, help="số frame có nhãn tối đa để đánh giá")
+    parser.add_argument('--batch-size', type=int, default=config.config.get('detector', {}).get('batch_size', 4))
+    parser.add_argument('--rounds', type=int, default=3, help="số vòng đo tốc độ")
+    parser.add_argument('--report', default='quantize_report.json', help="file báo cáo JSON")
+    args = parser.parse_args()
+
+    if not Path(args.fp32).exists():
+        print(f"📦 Export {args.model} sang ONNX...")
+        exported = export_onnx(args.model)
+        if Path(exported).resolve() != Path(args.fp32).resolve():
+            Path(exported).replace(args.fp32)
+
+    calibration_images = collect_calibration_images(args.image_dir, args.calib_size)
+    print(f"🖼️ {len(calibration_images)} ảnh hiệu chỉnh")
+
+    print(f"⚙️ Lượng tử hóa {args.mode}: {args.fp32} -> {args.output}")
+    quantize(args.fp32, args.output, args.mode, calibration_images)
+
+    fp32 = OnnxBackend(args.fp32, num_threads=inference_config.get('num_threads', 0))
+    int8 = OnnxBackend(args.output, num_threads=inference_config.get('num_threads', 0))
+
+    labeled_frames = frame_repo.get_labeled_frames(args.eval_size)
+    fp32_accuracy, fp32_predictions = evaluate(fp32, labeled_frames)
+    int8_accuracy, int8_predictions = evaluate(int8, labeled_frames)
+    common = fp32_predictions.keys() & int8_predictions.keys()
+    agreement = sum(fp32_predictions[k] == int8_predictions[k] for k in common) / len(common) if common else None
+
+    bench_images = [img for img in (cv2.imread(p) for p in calibration_images[:64]) if img is not None]
+    report = {
+        'mode': args.mode,
+        'fp32_model': args.fp32,
+        'int8_model': args.output,
+        'fp32_size_mb': Path(args.fp32).stat().st_size / 1e6,
+        'int8_size_mb': Path(args.output).stat().st_size / 1e6,
+        'calibration_images': len(calibration_images),
+        'fp32': {**fp32_accuracy, 'fps': benchmark(fp32, bench_images, args.batch_size, args.rounds)},
+        'int8': {**int8_accuracy, 'fps': benchmark(int8, bench_images, args.batch_size, args.rounds)},
+        'prediction_agreement': agreement,
+    }
+
+    with open(args.report, 'w') as file:
+        json.dump(report, file, indent=4)
+
+    print(json.dumps(report, indent=4))
+    print(f"✅ Đã ghi báo cáo: {args.report}")
+    print("👉 Dùng model INT8: đặt inference.backend = \"onnx\" và inference.precision = \"int8\" trong config.json")
+
+
+if __name__ == '__main__':
+    main()
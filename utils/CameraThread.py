@@ -2,22 +2,65 @@ from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 import cv2
 import numpy as np
+import threading
+import time
+from core.frame_meta import FrameClock
+from utils.frame_pacing import LatestFrameMailbox, RateMeter, DeadlinePacer
+from utils.capture import format_capture_info
+from utils.frame_sources import create_frame_source
+import core.config as config
+
+# Định dạng BGR của Qt (từ Qt 5.14), None nếu bản Qt cũ hơn
+_QIMAGE_BGR888 = getattr(QImage, 'Format_BGR888', None)
 
 
 class CameraThread(QThread):
     """Thread xử lý camera và phát hiện buồn ngủ"""
 
     # Signals
-    frame_ready = pyqtSignal(QPixmap, dict)  # (frame, status_dict)
+    frame_ready = pyqtSignal()  # có frame mới, GUI lấy (frame, status_dict) bằng take_frame()
     drowsiness_alert = pyqtSignal(float, float)  # (drowsy_ratio, confidence)
     error_occurred = pyqtSignal(str)
-
-    def __init__(self, detector, camera_source=0):
+    camera_info = pyqtSignal(dict)  # định dạng camera thực tế sau khi mở
+
+    def __init__(self, detector, camera_source=None, camera_config=None):
+        """
+        Args:
+            detector: DrowsinessDetector
+            camera_source: Ghi đè camera.source trong config (None để dùng config): số camera,
+                           file video, thư mục ảnh hoặc "synthetic"
+            camera_config: Cấu hình camera, mặc định lấy mục `camera` trong config.json
+        """
         super().__init__()
         self.detector = detector
+        self.camera_config = camera_config if camera_config is not None else config.config.get("camera", {})
         self.camera_source = camera_source
+        self.target_fps = self.camera_config.get('fps', 30)
+        self.capture_info = {}
         self.running = False
         self.cap = None
+        # Gắn số thứ tự + timestamp cho từng frame ngay khi đọc
+        self.frame_clock = FrameClock()
+
+        # Thread đọc camera liên tục, chỉ giữ frame mới nhất trong mailbox
+        self.mailbox = LatestFrameMailbox()
+        self.grab_thread = None
+        self.grab_failed = False
+
+        # Đo tần suất từng giai đoạn: đọc camera, xử lý, hiển thị (GUI gọi display_meter.tick())
+        self.capture_meter = RateMeter()
+        self.process_meter = RateMeter()
+        self.display_meter = RateMeter()
+        # Buffer RGB dùng khi Qt không hỗ trợ Format_BGR888
+        self._rgb_buffer = None
+
+        # Kích thước vùng hiển thị (w, h) do GUI cập nhật, frame được thu nhỏ sẵn ở thread này
+        self.display_size = None
+        self._scaled_buffer = None
+        # Chỉ giữ frame hiển thị mới nhất chờ GUI lấy: GUI bận thì frame cũ bị thay thế thay vì dồn trong event queue
+        self._latest_display = None
+        self._display_lock = threading.Lock()
+        self.frames_coalesced = 0
 
         # Set callback cho detector
         self.detector.callback = self._on_drowsiness_detected
@@ -26,55 +69,155 @@ class CameraThread(QThread):
         """Callback khi phát hiện buồn ngủ"""
         self.drowsiness_alert.emit(drowsy_ratio, confidence)
 
+    def _grab_loop(self):
+        """Đọc camera liên tục vào mailbox, không chờ bên xử lý"""
+        # Chế độ tốc độ tối đa: chờ bên xử lý lấy frame thay vì ghi đè, không mất frame
+        lossless = self.cap.max_throughput
+        latency = self.detector.latency
+        while self.running:
+            read_start = time.perf_counter()
+            ret, frame = self.cap.read()
+            meta = self.frame_clock.tag()
+            if not ret:
+                # Hết file video/thư mục ảnh là kết thúc bình thường, không phải lỗi
+                self.grab_failed = not self.cap.exhausted or self.cap.realtime
+                break
+            latency.record('capture', (meta.capture_ts - read_start) * 1000)
+            self.capture_meter.tick()
+            self.mailbox.put((frame, meta), wait=lossless)
+        self.mailbox.close()
+
+    def rates(self):
+        """Tần suất (fps) của từng giai đoạn"""
+        return {
+            'capture_fps': self.capture_meter.rate,
+            'process_fps': self.process_meter.rate,
+            'display_fps': self.display_meter.rate,
+            'frames_overwritten': self.mailbox.overwritten,
+            'frames_coalesced': self.frames_coalesced,
+        }
+
+    def set_display_size(self, width, height):
+        """GUI báo kích thước vùng hiển thị hiện tại (gọi từ GUI thread)"""
+        self.display_size = (int(width), int(height)) if width > 0 and height > 0 else None
+
+    def take_frame(self):
+        """GUI lấy (pixmap, status) mới nhất, None nếu đã lấy rồi"""
+        with self._display_lock:
+            item, self._latest_display = self._latest_display, None
+        return item
+
+    def _publish_frame(self, pixmap, status):
+        with self._display_lock:
+            pending = self._latest_display is not None
+            if pending:
+                self.frames_coalesced += 1
+            self._latest_display = (pixmap, status)
+        # GUI chưa lấy frame trước thì tín hiệu trước vẫn đang chờ trong event queue, không phát thêm
+        if not pending:
+            self.frame_ready.emit()
+
     def run(self):
         """Chạy thread"""
         self.running = True
-        self.cap = cv2.VideoCapture(self.camera_source)
-
-        # Cấu hình camera
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        try:
+            self.cap = create_frame_source(self.camera_config, self.camera_source)
+        except Exception as e:
+            self.error_occurred.emit(f"Không thể mở camera: {e}")
+            return
 
         if not self.cap.isOpened():
             self.error_occurred.emit("Không thể mở camera!")
+            self._cleanup()
             return
 
-        while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                self.error_occurred.emit("Không đọc được frame từ camera!")
-                break
-
-            # Xử lý frame qua detector
-            processed_frame, status = self.detector.process_frame(frame)
+        # Kiểm tra định dạng thực tế camera đã nhận
+        self.capture_info = self.cap.probe(self.camera_config.get('probe_frames', 10))
+        print(f"📷 Camera: {format_capture_info(self.capture_info)}")
+        self.camera_info.emit(self.capture_info)
 
-            # Convert sang QPixmap
-            pixmap = self._convert_cv_to_pixmap(processed_frame)
+        self.grab_thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self.grab_thread.start()
+        pacer = DeadlinePacer(0 if self.cap.max_throughput else self.target_fps)
+        start_time = time.perf_counter()
 
-            # Emit signal
-            self.frame_ready.emit(pixmap, status)
-
-            # Giảm tải CPU
-            self.msleep(33)  # ~30 FPS
+        while self.running:
+            item = self.mailbox.get(timeout=1.0)
+            if item is None:
+                if self.mailbox.closed:
+                    if self.grab_failed:
+                        self.error_occurred.emit("Không đọc được frame từ camera!")
+                    break
+                continue
+            frame, meta = item
+
+            # Xử lý frame qua detector (frame trả về không vẽ overlay, GUI vẽ overlay từ status)
+            frame, status = self.detector.process_frame(frame, meta)
+
+            # Thu nhỏ theo vùng hiển thị rồi convert sang QPixmap
+            pixmap_start = time.perf_counter()
+            pixmap = self._convert_cv_to_pixmap(self._scale_for_display(frame))
+            self.detector.latency.record_since('pixmap', pixmap_start)
+
+            # Giao frame cho GUI
+            self.process_meter.tick()
+            status.update(self.rates())
+            self._publish_frame(pixmap, status)
+
+            # Giữ nhịp theo deadline (~target_fps), không cộng dồn thời gian xử lý
+            delay = pacer.delay()
+            if delay > 0:
+                time.sleep(delay)
+
+        if self.cap.exhausted and not self.grab_failed:
+            elapsed = time.perf_counter() - start_time
+            processed = self.process_meter.total
+            print(f"🏁 Hết nguồn {self.cap.kind}: {processed} frame trong {elapsed:.1f}s "
+                  f"({processed / elapsed if elapsed > 0 else 0:.1f} FPS)")
 
+        self.running = False
         self._cleanup()
 
+    def _scale_for_display(self, frame):
+        """Resize frame vừa vùng hiển thị (giữ tỷ lệ) vào buffer cấp phát sẵn, INTER_AREA khi thu nhỏ"""
+        size = self.display_size
+        if size is None:
+            return frame
+        h, w = frame.shape[:2]
+        scale = min(size[0] / w, size[1] / h)
+        target_w, target_h = max(1, int(w * scale)), max(1, int(h * scale))
+        if (target_w, target_h) == (w, h):
+            return frame
+        if self._scaled_buffer is None or self._scaled_buffer.shape != (target_h, target_w, frame.shape[2]):
+            self._scaled_buffer = np.empty((target_h, target_w, frame.shape[2]), dtype=frame.dtype)
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        return cv2.resize(frame, (target_w, target_h), dst=self._scaled_buffer, interpolation=interpolation)
+
     def _convert_cv_to_pixmap(self, cv_img):
-        """Convert OpenCV image sang QPixmap"""
-        rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
+        """Convert OpenCV image (BGR) sang QPixmap, QImage đọc thẳng buffer của frame không qua bản sao RGB"""
+        h, w, ch = cv_img.shape
         bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
+        if _QIMAGE_BGR888 is not None:
+            qt_image = QImage(cv_img.data, w, h, bytes_per_line, _QIMAGE_BGR888)
+        else:
+            # Qt < 5.14 chưa có Format_BGR888: đổi kênh vào buffer RGB cấp phát sẵn
+            if self._rgb_buffer is None or self._rgb_buffer.shape != cv_img.shape:
+                self._rgb_buffer = np.empty_like(cv_img)
+            cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
+            qt_image = QImage(self._rgb_buffer.data, w, h, bytes_per_line, QImage.Format_RGB888)
+        # fromImage chép dữ liệu sang pixmap nên buffer của frame được dùng lại ngay sau đó
         return QPixmap.fromImage(qt_image)
 
     def stop(self):
         """Dừng thread"""
         self.running = False
+        self.mailbox.close()
         self.wait(3000)  # Đợi tối đa 3 giây
 
     def _cleanup(self):
         """Dọn dẹp resources"""
+        if self.grab_thread is not None:
+            self.grab_thread.join(timeout=1)
+            self.grab_thread = None
         if self.cap is not None:
             self.cap.release()
@@ -0,0 +1,99 @@
+import time
+
+import cv2
+
+# Tên backend trong config.json -> hằng số OpenCV
+CAPTURE_BACKENDS = {
+    'any': cv2.CAP_ANY,
+    'v4l2': cv2.CAP_V4L2,
+    'ffmpeg': cv2.CAP_FFMPEG,
+    'gstreamer': cv2.CAP_GSTREAMER,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+    'avfoundation': cv2.CAP_AVFOUNDATION,
+}
+
+
+def decode_fourcc(value):
+    """Đổi giá trị CAP_PROP_FOURCC (số) sang chuỗi 4 ký tự, ví dụ 'MJPG'"""
+    value = int(value)
+    if value <= 0:
+        return ''
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+
+def open_capture(camera_config, source=None):
+    """
+    Mở camera theo cấu hình `camera` trong config.json
+    Args:
+        camera_config: dict gồm source, frame_width, frame_height, fps, fourcc, backend, pipeline
+        source: ghi đè camera_config['source'] nếu khác None
+    Returns: cv2.VideoCapture
+    """
+    pipeline = camera_config.get('pipeline')
+    backend_name = str(camera_config.get('backend') or ('gstreamer' if pipeline else 'any')).lower()
+    if backend_name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Backend camera không hợp lệ: {backend_name} (hỗ trợ: {', '.join(CAPTURE_BACKENDS)})")
+
+    if source is None:
+        source = pipeline or camera_config.get('source', 0)
+    cap = cv2.VideoCapture(source, CAPTURE_BACKENDS[backend_name])
+
+    # Pipeline GStreamer tự quy định định dạng, không set thuộc tính
+    if pipeline and source == pipeline:
+        return cap
+
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    # FOURCC phải set trước kích thước để driver (V4L2) chọn đúng chế độ
+    fourcc = camera_config.get('fourcc')
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*str(fourcc).ljust(4)[:4]))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera_config.get('frame_width', 640))
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_config.get('frame_height', 480))
+    cap.set(cv2.CAP_PROP_FPS, camera_config.get('fps', 30))
+    return cap
+
+
+def probe_capture(cap, camera_config, probe_frames=10):
+    """
+    Kiểm tra định dạng thực tế camera đã nhận: độ phân giải, FPS, FOURCC báo cáo
+    và FPS đo được khi đọc thử probe_frames frame.
+    Returns: dict thông tin camera
+    """
+    info = {
+        'backend': cap.getBackendName() if hasattr(cap, 'getBackendName') else '',
+        'requested': {
+            'width': camera_config.get('frame_width', 640),
+            'height': camera_config.get('frame_height', 480),
+            'fps': camera_config.get('fps', 30),
+            'fourcc': camera_config.get('fourcc') or '',
+        },
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'fourcc': decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC)),
+        'measured_fps': None,
+    }
+
+    if probe_frames > 0:
+        # Frame đầu thường chậm do camera khởi động, không tính vào thời gian
+        ret, frame = cap.read()
+        if ret:
+            info['height'], info['width'] = frame.shape[:2]
+            start = time.perf_counter()
+            count = 0
+            for _ in range(probe_frames):
+                ret, _ = cap.read()
+                if not ret:
+                    break
+                count += 1
+            elapsed = time.perf_counter() - start
+            if count and elapsed > 0:
+                info['measured_fps'] = count / elapsed
+    return info
+
+
+def format_capture_info(info):
+    measured = f"{info['measured_fps']:.1f}" if info['measured_fps'] else "?"
+    return (f"{info['width']}x{info['height']} @ {info['fps']:.0f} FPS (đo được {measured} FPS), "
+            f"FOURCC={info['fourcc'] or '?'}, backend={info['backend'] or '?'}")
@@ -0,0 +1,101 @@
+import threading
+import time
+
+
+class LatestFrameMailbox:
+    """
+    Hộp thư 1 chỗ giữa thread đọc camera và thread xử lý:
+    frame mới luôn ghi đè frame chưa được lấy, nên bên xử lý luôn nhận frame mới nhất.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.put_count = 0
+        self.overwritten = 0  # số frame bị ghi đè trước khi được xử lý
+
+    def put(self, item, wait=False):
+        """
+        Args:
+            wait: True thì chờ frame trước được lấy thay vì ghi đè (không mất frame, dùng khi đo tốc độ tối đa)
+        """
+        with self._cond:
+            if wait:
+                self._cond.wait_for(lambda: self._item is None or self._closed)
+                if self._closed:
+                    return
+            if self._item is not None:
+                self.overwritten += 1
+            self._item = item
+            self.put_count += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Chờ và lấy frame mới nhất
+        Returns: item hoặc None nếu hết thời gian chờ / mailbox đã đóng
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            if item is not None:
+                self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class RateMeter:
+    """Đo tần suất sự kiện (lần/giây), cập nhật mỗi `interval` giây"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.rate = 0.0
+        self.total = 0
+        self._count = 0
+        self._window_start = time.perf_counter()
+
+    def tick(self, n=1):
+        self._count += n
+        self.total += n
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed >= self.interval:
+            self.rate = self._count / elapsed
+            self._count = 0
+            self._window_start = now
+
+    def reset(self):
+        self.rate = 0.0
+        self.total = 0
+        self._count = 0
+        self._window_start = time.perf_counter()
+
+
+class DeadlinePacer:
+    """Giữ nhịp theo deadline cố định thay vì sleep cố định sau mỗi vòng lặp"""
+
+    def __init__(self, fps):
+        self.period = 1.0 / fps if fps and fps > 0 else 0.0
+        self.next_deadline = time.perf_counter()
+
+    def delay(self):
+        """
+        Tính thời gian cần chờ đến deadline kế tiếp.
+        Nếu đã trễ thì bắt nhịp lại từ hiện tại, không dồn nợ thời gian.
+        """
+        now = time.perf_counter()
+        self.next_deadline += self.period
+        remaining = self.next_deadline - now
+        if remaining <= 0:
+            self.next_deadline = now
+            return 0.0
+        return remaining
@@ -0,0 +1,260 @@
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+from utils.capture import open_capture, probe_capture
+from utils.frame_pacing import DeadlinePacer
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource:
+    """
+    Nguồn frame dùng chung cho CameraThread: camera, file video, thư mục ảnh hoặc frame tổng hợp.
+    Giao diện giống cv2.VideoCapture (isOpened/read/release) để thread đọc không cần phân biệt.
+
+    Các nguồn không phải camera tự giữ nhịp theo fps * speed; max_throughput=True bỏ giữ nhịp
+    và yêu cầu bên đọc không được bỏ frame (dùng đo tốc độ tối đa của detector).
+    """
+
+    kind = 'base'
+    realtime = False  # True nếu nguồn tự có nhịp thật (camera)
+
+    def __init__(self, fps=30, speed=1.0, max_throughput=False, loop=False):
+        self.fps = fps
+        self.speed = speed if speed and speed > 0 else 1.0
+        self.max_throughput = max_throughput
+        self.loop = loop
+        self.exhausted = False  # True khi đọc hết nguồn (không phải lỗi)
+        self.frames_read = 0
+        self._pacer = None
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        """
+        Đọc frame tiếp theo, giữ nhịp nếu cần
+        Returns: (ret, frame) giống cv2.VideoCapture.read()
+        """
+        if not self.max_throughput and not self.realtime:
+            if self._pacer is None:
+                self._pacer = DeadlinePacer(self.fps * self.speed)
+            delay = self._pacer.delay()
+            if delay > 0:
+                time.sleep(delay)
+
+        ret, frame = self._read()
+        if not ret and self.loop and self.frames_read:
+            self._rewind()
+            ret, frame = self._read()
+        if ret:
+            self.frames_read += 1
+        else:
+            self.exhausted = True
+        return ret, frame
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _rewind(self):
+        pass
+
+    def release(self):
+        pass
+
+    def probe(self, probe_frames=0):
+        """Thông tin nguồn frame (cùng dạng với utils.capture.probe_capture)"""
+        return {
+            'backend': self.kind,
+            'requested': {},
+            'width': 0,
+            'height': 0,
+            'fps': self.fps * self.speed if not self.max_throughput else 0.0,
+            'fourcc': '',
+            'measured_fps': None,
+        }
+
+
+class DeviceSource(FrameSource):
+    """Camera thật (hoặc pipeline GStreamer) mở theo cấu hình camera trong config.json"""
+
+    kind = 'device'
+    realtime = True
+
+    def __init__(self, camera_config, source=None):
+        super().__init__(fps=camera_config.get('fps', 30))
+        self.camera_config = camera_config
+        self.cap = open_capture(camera_config, source)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+    def probe(self, probe_frames=0):
+        return probe_capture(self.cap, self.camera_config, probe_frames)
+
+
+class VideoFileSource(FrameSource):
+    """File video ghi sẵn, phát theo FPS gốc nhân speed"""
+
+    kind = 'video'
+
+    def __init__(self, path, speed=1.0, max_throughput=False, loop=False):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        super().__init__(fps=fps if fps and fps > 0 else 30, speed=speed,
+                         max_throughput=max_throughput, loop=loop)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _read(self):
+        return self.cap.read()
+
+    def _rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        self.cap.release()
+
+    def probe(self, probe_frames=0):
+        info = super().probe()
+        info['width'] = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        info['height'] = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        info['frame_count'] = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return info
+
+
+def _natural_key(path):
+    """Sắp xếp 'frame_idx=2' trước 'frame_idx=10'"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path)]
+
+
+class ImageDirectorySource(FrameSource):
+    """Thư mục ảnh (ví dụ các clip trong drowsy_images), đọc theo thứ tự tên tự nhiên"""
+
+    kind = 'images'
+
+    def __init__(self, directory, fps=30, speed=1.0, max_throughput=False, loop=False):
+        super().__init__(fps=fps, speed=speed, max_throughput=max_throughput, loop=loop)
+        self.directory = directory
+        self.paths = sorted((os.path.join(root, name)
+                             for root, _, names in os.walk(directory)
+                             for name in names if name.lower().endswith(IMAGE_EXTENSIONS)),
+                            key=_natural_key)
+        self.index = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def _read(self):
+        # Bỏ qua ảnh hỏng thay vì dừng cả nguồn
+        while self.index < len(self.paths):
+            frame = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def _rewind(self):
+        self.index = 0
+
+    def probe(self, probe_frames=0):
+        info = super().probe()
+        if self.paths:
+            first = cv2.imread(self.paths[0])
+            if first is not None:
+                info['height'], info['width'] = first.shape[:2]
+        info['frame_count'] = len(self.paths)
+        return info
+
+
+class SyntheticSource(FrameSource):
+    """
+    Frame tổng hợp có nhúng số thứ tự và timestamp, không cần camera.
+    Ngoài chữ vẽ lên ảnh, 16 byte đầu của hàng cuối chứa (seq int64, perf_counter float64)
+    để đo độ trễ end-to-end bằng SyntheticSource.decode().
+    """
+
+    kind = 'synthetic'
+
+    def __init__(self, width=640, height=480, fps=30, speed=1.0, max_throughput=False, frame_count=None):
+        super().__init__(fps=fps, speed=speed, max_throughput=max_throughput)
+        self.width = width
+        self.height = height
+        self.frame_count = frame_count
+        # Nền gradient dựng sẵn, mỗi frame chỉ copy rồi vẽ chữ
+        gradient = np.linspace(40, 200, width, dtype=np.uint8)
+        self._background = np.repeat(np.tile(gradient, (height, 1))[:, :, None], 3, axis=2)
+        self._seq = 0
+
+    def _read(self):
+        if self.frame_count is not None and self._seq >= self.frame_count:
+            return False, None
+        frame = self._background.copy()
+        seq, ts = self._seq, time.perf_counter()
+        self._seq += 1
+        # Khối sáng di chuyển để frame liên tiếp khác nhau
+        x = (seq * 8) % max(1, self.width - 80)
+        cv2.rectangle(frame, (x, self.height // 2 - 40), (x + 80, self.height // 2 + 40), (255, 255, 255), -1)
+        cv2.putText(frame, f"#{seq} {time.time():.3f}", (10, self.height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+        frame[-1].reshape(-1)[:16] = np.concatenate((np.array([seq], dtype=np.int64).view(np.uint8),
+                                                     np.array([ts], dtype=np.float64).view(np.uint8)))
+        return True, frame
+
+    def _rewind(self):
+        self._seq = 0
+
+    @staticmethod
+    def decode(frame):
+        """Đọc lại (seq, perf_counter lúc tạo) nhúng trong frame tổng hợp"""
+        raw = np.ascontiguousarray(frame[-1]).reshape(-1)[:16]
+        return int(raw[:8].view(np.int64)[0]), float(raw[8:].view(np.float64)[0])
+
+    def probe(self, probe_frames=0):
+        info = super().probe()
+        info['width'], info['height'] = self.width, self.height
+        return info
+
+
+def create_frame_source(camera_config, source=None):
+    """
+    Tạo nguồn frame theo camera.source trong config.json:
+        số (0, 1, ...)                          -> camera
+        camera.pipeline (khi không truyền source) -> camera mở bằng pipeline
+        "synthetic"                             -> frame tổng hợp
+        thư mục                                 -> thư mục ảnh
+        đường dẫn file                          -> file video
+    Args:
+        camera_config: mục `camera` trong config.json
+        source: ghi đè camera_config['source'] (và camera.pipeline) nếu khác None
+    """
+    source_arg = source
+    if source is None:
+        source = camera_config.get('source', 0)
+    speed = camera_config.get('playback_speed', 1.0)
+    max_throughput = camera_config.get('max_throughput', False)
+    loop = camera_config.get('loop', False)
+
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if isinstance(source, int) or (source_arg is None and camera_config.get('pipeline')):
+        return DeviceSource(camera_config, source if isinstance(source, int) else None)
+    if source == 'synthetic':
+        return SyntheticSource(camera_config.get('frame_width', 640), camera_config.get('frame_height', 480),
+                               camera_config.get('fps', 30), speed, max_throughput,
+                               camera_config.get('synthetic_frames'))
+    if os.path.isdir(source):
+        return ImageDirectorySource(source, camera_config.get('fps', 30), speed, max_throughput, loop)
+    return VideoFileSource(source, speed, max_throughput, loop)
@@ -0,0 +1,107 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+import os
+import threading
+import time
+import core.config as config
+from utils.startup_profiler import startup_profiler
+
+# Màu hiển thị theo trạng thái nạp model
+STATE_COLORS = {'loading': '#f39c12', 'ready': '#27ae60', 'error': '#e74c3c'}
+
+
+def show_model_status(label, state, message):
+    """Hiển thị trạng thái nạp model nền (ModelPreloader.state_changed) lên QLabel"""
+    label.setText(message)
+    label.setStyleSheet(f"color: {STATE_COLORS.get(state, '#7f8c8d')};")
+
+
+class ModelPreloader(QObject):
+    """
+    Import thư viện suy luận và nạp + warmup model trong thread nền (khi đang ở màn hình đăng nhập),
+    model được giữ trong core.model_cache để bấm "Bắt đầu" không phải chờ.
+    """
+
+    # (trạng thái: 'loading' | 'ready' | 'error', thông báo hiển thị)
+    state_changed = pyqtSignal(str, str)
+
+    def __init__(self):
+        super().__init__()
+        self.state = 'idle'
+        self.model_path = None
+        self.timings = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resolve_model_path(user_id=None):
+        """
+        Model cần dùng: weight đang chọn của người dùng (Weight.isCurrentlyUse), nếu không có
+        hoặc file không tồn tại thì dùng `model_path` trong config.json
+        """
+        if user_id is not None:
+            try:
+                import repository.weight_repo as weight_repo
+                weight = weight_repo.get_current_weight(user_id)
+                if weight and weight.get('storageURL') and os.path.exists(weight['storageURL']):
+                    return weight['storageURL']
+            except Exception as e:
+                print(f"⚠️ Không đọc được weight của người dùng: {e}")
+        model_path = config.config.get('model_path', 'core/best.pt')
+        return model_path if os.path.exists(model_path) else None
+
+    def start(self, model_path):
+        """Bắt đầu nạp model_path trong nền (model đã có trong cache thì xong gần như ngay lập tức)"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self.model_path = model_path
+        if not model_path:
+            self._set_state(generation, 'error', "⚠️ Chưa có model")
+            return
+        self._set_state(generation, 'loading', "⏳ Đang nạp model...")
+        threading.Thread(target=self._run, args=(generation, model_path), daemon=True).start()
+
+    def is_ready(self):
+        return self.state == 'ready'
+
+    def _set_state(self, generation, state, message):
+        with self._lock:
+            if generation != self._generation:
+                # Đã có yêu cầu nạp model khác mới hơn
+                return
+            self.state = state
+        self.state_changed.emit(state, message)
+
+    def _run(self, generation, model_path):
+        inference_config = config.config.get('inference', {})
+        camera_config = config.config.get('camera', {})
+        timings = {}
+        start = time.perf_counter()
+        try:
+            # Import nặng (torch/ultralytics hoặc onnxruntime) chạy ở đây thay vì lúc bấm "Bắt đầu"
+            import_start = time.perf_counter()
+            import core.model_cache as model_cache
+            import core.DrowsinessDetector  # noqa: F401
+            if inference_config.get('backend', 'ultralytics') == 'onnx' or str(model_path).endswith('.onnx'):
+                import onnxruntime  # noqa: F401
+            else:
+                import ultralytics  # noqa: F401
+            timings['import_ms'] = (time.perf_counter() - import_start) * 1000
+
+            frame_shape = (camera_config.get('frame_height', 480), camera_config.get('frame_width', 640), 3)
+            backend = model_cache.acquire(model_path, inference_config,
+                                          warmup_batch=config.config.get('detector', {}).get('batch_size', 4),
+                                          frame_shape=frame_shape, timings=timings)
+            model_cache.release(backend)
+        except Exception as e:
+            print(f"❌ Lỗi nạp model {model_path}: {e}")
+            self._set_state(generation, 'error', "❌ Lỗi nạp model")
+            return
+
+        timings['total_ms'] = (time.perf_counter() - start) * 1000
+        self.timings = timings
+        for name, value in timings.items():
+            startup_profiler.record(f"model: {name[:-3]}", value)
+        print("⏱️ Nạp model " + os.path.basename(model_path) + ": " +
+              " | ".join(f"{name[:-3]} {value:.0f} ms" for name, value in timings.items()))
+        self._set_state(generation, 'ready', f"✅ Model sẵn sàng ({os.path.basename(model_path)})")
@@ -0,0 +1,160 @@
+"""
+Đo thời gian khởi động ứng dụng: thời gian import từng module, khởi tạo view, tạo bảng database và nạp model.
+
+Bật bằng tham số `--profile-startup` hoặc biến môi trường DROWSY_PROFILE_STARTUP=1
+(giá trị khác "1" được dùng làm đường dẫn file báo cáo). Báo cáo ghi ra startup_profile.txt,
+sắp xếp theo thời gian giảm dần. Khi không bật, section() và record() gần như không tốn gì.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _ImportTimer:
+    """Meta path finder đo thời gian exec_module của từng module được import"""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._local, 'finding', False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+
+        loader = spec.loader
+        # Loader dùng chung (builtin/frozen là class) không gắn được hàm đo riêng cho từng module
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return spec
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            stack = self._stack()
+            stack.append(0.0)  # tổng thời gian của các import con
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.profiler.imports[fullname] = (elapsed * 1000, (elapsed - children) * 1000)
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+        return spec
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.report_path = 'startup_profile.txt'
+        self.start_time = time.perf_counter()
+        self.imports = {}  # module -> (ms tích lũy gồm import con, ms riêng)
+        self.sections = []  # (tên, ms)
+        self._lock = threading.Lock()
+        self._finder = None
+
+    def enable_from_env(self, argv=None):
+        """Bật profiler nếu có --profile-startup hoặc DROWSY_PROFILE_STARTUP, trả về trạng thái"""
+        argv = sys.argv if argv is None else argv
+        env = os.environ.get('DROWSY_PROFILE_STARTUP', '')
+        if '--profile-startup' in argv:
+            argv.remove('--profile-startup')
+            self.enable()
+        elif env and env != '0':
+            self.enable(None if env == '1' else env)
+        return self.enabled
+
+    def enable(self, report_path=None):
+        if report_path:
+            self.report_path = report_path
+        if self.enabled:
+            return
+        self.enabled = True
+        self._finder = _ImportTimer(self)
+        sys.meta_path.insert(0, self._finder)
+        print(f"⏱️ Bật đo thời gian khởi động, báo cáo: {self.report_path}")
+
+    def stop_import_timing(self):
+        """Gỡ bộ đo import (các import sau đó không còn bị đo)"""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    @contextmanager
+    def section(self, name):
+        """Đo một giai đoạn khởi động: with startup_profiler.section("create_tables"): ..."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name, ms):
+        if self.enabled:
+            with self._lock:
+                self.sections.append((name, ms))
+
+    def mark(self, name):
+        """Ghi mốc thời gian tính từ lúc process bắt đầu (ví dụ lúc cửa sổ hiển thị lần đầu)"""
+        self.record(f"[mốc] {name}", (time.perf_counter() - self.start_time) * 1000)
+
+    def report(self, top=40):
+        with self._lock:
+            sections = sorted(self.sections, key=lambda item: item[1], reverse=True)
+            imports = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        top_level = [(name, times) for name, times in imports if '.' not in name]
+        lines = [
+            f"=== Startup profile ({time.strftime('%Y-%m-%d %H:%M:%S')}) ===",
+            f"Tổng thời gian chạy đến lúc ghi báo cáo: {(time.perf_counter() - self.start_time) * 1000:.0f} ms",
+            f"Số module đã import: {len(imports)}",
+            "",
+            "Giai đoạn (ms):",
+        ]
+        lines += [f"{ms:10.1f}  {name}" for name, ms in sections]
+        lines += ["", "Package cấp cao nhất (ms tích lũy):"]
+        lines += [f"{cumulative:10.1f}  {name}" for name, (cumulative, _) in top_level[:top]]
+        lines += ["", f"Top {top} module theo thời gian tích lũy (ms tích lũy / ms riêng):"]
+        lines += [f"{cumulative:10.1f} {own:10.1f}  {name}" for name, (cumulative, own) in imports[:top]]
+        by_self = sorted(imports, key=lambda item: item[1][1], reverse=True)[:top]
+        lines += ["", f"Top {top} module theo thời gian riêng (ms riêng):"]
+        lines += [f"{own:10.1f}  {name}" for name, (_, own) in by_self]
+        return "\n".join(lines) + "\n"
+
+    def write_report(self):
+        """Ghi báo cáo ra file (ghi đè, gọi nhiều lần được)"""
+        if not self.enabled:
+            return None
+        with open(self.report_path, 'w', encoding='utf-8') as file:
+            file.write(self.report())
+        print(f"✅ Đã ghi báo cáo khởi động: {self.report_path}")
+        return self.report_path
+
+
+# Singleton dùng chung trong toàn ứng dụng
+startup_profiler = StartupProfiler()
@@ -2,12 +2,17 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QPushButton, QTableWidget, QTableWidgetItem,
                              QHeaderView, QGroupBox, QMessageBox, QFileDialog,
                              QScrollArea, QSizePolicy)
-from PyQt5.QtCore import pyqtSignal, Qt, QTimer, QDateTime, QSize
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer, QDateTime, QSize, QRect
 from PyQt5.QtGui import QFont, QColor, QPixmap
 from views.Dialogs import DrowsinessAlertDialog, RestAlertDialog
+from views.StatusOverlay import StatusOverlay
+from utils.model_preloader import show_model_status
 
 import os
+import threading
+import time
 import traceback
+from functools import partial
 import core.config as config
 
 
@@ -25,6 +30,11 @@ class DashboardView(QWidget):
         self.drowsiness_window = 300  # 5 minutes
         self.camera_thread = None
         self.detector = None
+        # Chế độ nhiều camera: engine suy luận dùng chung và các camera phụ [(detector, camera_thread, label)]
+        self.inference_engine = None
+        self.extra_streams = []
+        # Ghi log metrics định kỳ (metrics.log_interval_s trong config.json)
+        self.metrics_sampler = None
         self.current_alert_timestamp = None
         self.current_session_id = None
         self.model_path = None
@@ -43,7 +53,13 @@ class DashboardView(QWidget):
         camera_widget = self.create_camera_view()
         content_layout.addWidget(camera_widget, 60)
         log_widget = self.create_log_view()
-        content_layout.addWidget(log_widget, 40)
+        right_layout = QVBoxLayout()
+        right_layout.setSpacing(5)
+        right_layout.addWidget(log_widget, 1)
+        # Bảng độ trễ từng giai đoạn (tùy chọn, bật bằng metrics.latency_panel trong config.json)
+        if config.config.get("metrics", {}).get("latency_panel", False):
+            right_layout.addWidget(self.create_latency_panel())
+        content_layout.addLayout(right_layout, 40)
 
         main_layout.addLayout(content_layout, 1)
         self.setLayout(main_layout)
@@ -60,6 +76,11 @@ class DashboardView(QWidget):
         self.drive_time_label.setFont(QFont('Arial', 10))
         self.drive_time_label.setStyleSheet("color: #27ae60;")
 
+        # Trạng thái nạp model nền
+        self.model_status_label = QLabel("")
+        self.model_status_label.setFont(QFont('Arial', 9))
+        self.model_status_label.setStyleSheet("color: #7f8c8d;")
+
         # NÚT MỚI: Thống kê
         stats_button = QPushButton("📊 Thống kê")
         stats_button.setMaximumHeight(35)
@@ -141,6 +162,7 @@ class DashboardView(QWidget):
 
         layout.addWidget(self.user_label)
         layout.addWidget(self.drive_time_label)
+        layout.addWidget(self.model_status_label)
         layout.addStretch()
         layout.addWidget(stats_button)  # NÚT MỚI
         layout.addWidget(video_button)  # NÚT MỚI
@@ -185,6 +207,8 @@ class DashboardView(QWidget):
             }
         """)
         self.camera_label.setText("📷\n\nCamera chưa hoạt động\n\nNhấn 'Bắt đầu' để khởi động")
+        # Overlay trạng thái vẽ bằng QPainter chồng lên video
+        self.camera_label.status_overlay = StatusOverlay(self.camera_label)
 
         status_layout = QHBoxLayout()
         status_layout.setSpacing(10)
@@ -193,11 +217,22 @@ class DashboardView(QWidget):
         self.alert_count_label = QLabel("⚠️ 0/3")
         self.alert_count_label.setFont(QFont('Arial', 9))
         self.alert_count_label.setStyleSheet("color: #27ae60;")
+        # Hiện khi engine suy luận báo lỗi: khởi động lại process suy luận mà không dừng giám sát
+        self.restart_inference_button = QPushButton("🔁 Khởi động lại suy luận")
+        self.restart_inference_button.setFont(QFont('Arial', 9))
+        self.restart_inference_button.clicked.connect(self.restart_inference)
+        self.restart_inference_button.hide()
         status_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.restart_inference_button)
         status_layout.addStretch()
         status_layout.addWidget(self.alert_count_label)
 
+        # Khung hình các camera phụ (chế độ nhiều camera)
+        self.extra_camera_layout = QHBoxLayout()
+        self.extra_camera_layout.setSpacing(5)
+
         layout.addWidget(self.camera_label, 1)
+        layout.addLayout(self.extra_camera_layout)
         layout.addLayout(status_layout)
         group.setLayout(layout)
         return group
@@ -299,6 +334,42 @@ class DashboardView(QWidget):
         group.setLayout(layout)
         return group
 
+    def create_latency_panel(self):
+        group = QGroupBox("⏱️ Độ trễ (ms)")
+        group.setFont(QFont('Arial', 10, QFont.Bold))
+        layout = QVBoxLayout()
+        layout.setContentsMargins(8, 15, 8, 8)
+
+        self.latency_label = QLabel("Chưa có dữ liệu")
+        self.latency_label.setFont(QFont('Courier New', 8))
+        self.latency_label.setStyleSheet("color: #2c3e50;")
+        export_button = QPushButton("💾 Xuất JSON")
+        export_button.clicked.connect(self.export_latency_report)
+
+        layout.addWidget(self.latency_label)
+        layout.addWidget(export_button)
+        group.setLayout(layout)
+
+        self.latency_timer = QTimer(self)
+        self.latency_timer.timeout.connect(self.update_latency_panel)
+        self.latency_timer.start(1000)
+        return group
+
+    def update_latency_panel(self):
+        if self.detector:
+            self.latency_label.setText(self.detector.latency.format_table())
+
+    def export_latency_report(self):
+        if not self.detector:
+            QMessageBox.information(self, "Độ trễ", "Chưa bắt đầu giám sát!")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Lưu báo cáo độ trễ", "latency_report.json", "JSON (*.json)")
+        if path:
+            extra_streams = {detector.stream_name: detector.latency.snapshot()
+                             for detector, _, _ in self.extra_streams}
+            self.detector.latency.to_json(path, {'extra_streams': extra_streams} if extra_streams else None)
+            print(f"✅ Đã ghi báo cáo độ trễ: {path}")
+
     def set_user_info(self, user_info):
         self.current_user = user_info
         full_name = user_info['full_name']
@@ -309,6 +380,9 @@ class DashboardView(QWidget):
     def set_session_info(self, session_id):
         self.current_session_id = session_id
 
+    def set_model_status(self, state, message):
+        show_model_status(self.model_status_label, state, message)
+
     def toggle_monitoring(self):
         if self.start_time is None:
             self.start_monitoring()
@@ -322,26 +396,58 @@ class DashboardView(QWidget):
             if not self.model_path:
                 return
 
-            from core.DrowsinessDetector import DrowsinessDetector
+            from core.DrowsinessDetector import DrowsinessDetector, InferenceEngine
             from utils.CameraThread import CameraThread
 
+            batch_size = config.config.get("detector", {}).get("batch_size", 4)
+            camera_configs = self.get_camera_configs()
+            multi_camera = len(camera_configs) > 1
+            if multi_camera:
+                # Một model dùng chung, batch gom frame từ mọi camera
+                self.inference_engine = InferenceEngine(self.model_path, batch_size)
+                print(f"✅ Shared inference engine for {len(camera_configs)} cameras")
+
             print(
                 f"🔧 Initializing detector with user_id={self.current_user['id']}, session_id={self.current_session_id}")
-            self.detector = DrowsinessDetector(
-                model_path=self.model_path,
-                batch_size=4,
-                alert_threshold=3,
-                session_id=self.current_session_id,
-            )
+            for index, camera_config in enumerate(camera_configs):
+                stream_name = camera_config.get("name", f"cam{index}") if multi_camera else None
+                detector = DrowsinessDetector(
+                    model_path=self.model_path,
+                    batch_size=batch_size,
+                    alert_threshold=3,
+                    session_id=self.current_session_id,
+                    engine=self.inference_engine,
+                    stream_name=stream_name,
+                )
+                camera_thread = CameraThread(detector, camera_config=camera_config)
+                camera_thread.drowsiness_alert.connect(self.handle_drowsiness_alert)
+                camera_thread.error_occurred.connect(self.handle_camera_error)
+                if index == 0:
+                    self.detector = detector
+                    self.camera_thread = camera_thread
+                    camera_thread.frame_ready.connect(
+                        partial(self.deliver_frame, camera_thread, self.update_camera_frame))
+                    camera_thread.camera_info.connect(self.handle_camera_info)
+                    label = self.camera_label
+                    label.status_overlay.latency = detector.latency
+                else:
+                    label = self.create_extra_camera_label(stream_name)
+                    camera_thread.frame_ready.connect(partial(
+                        self.deliver_frame, camera_thread, partial(self.update_extra_camera_frame, label, camera_thread)))
+                    label.status_overlay.latency = detector.latency
+                    self.extra_streams.append((detector, camera_thread, label))
+                # Frame được thu nhỏ theo label ngay từ frame đầu tiên
+                camera_thread.set_display_size(label.contentsRect().width(), label.contentsRect().height())
+                camera_thread.start()
             print("✅ Detector initialized")
-
-            self.camera_thread = CameraThread(self.detector, camera_source=config.config.get("camera", 0)['source'])
-            self.camera_thread.frame_ready.connect(self.update_camera_frame)
-            self.camera_thread.drowsiness_alert.connect(self.handle_drowsiness_alert)
-            self.camera_thread.error_occurred.connect(self.handle_camera_error)
-            self.camera_thread.start()
             print("✅ Camera started")
 
+            metrics_config = config.config.get("metrics", {})
+            if metrics_config.get("log_interval_s"):
+                from core.metrics_sampler import MetricsSampler
+                self.metrics_sampler = MetricsSampler(self.active_detectors(), metrics_config["log_interval_s"],
+                                                      metrics_config.get("log_path")).start()
+
             self.start_time = QDateTime.currentDateTime()
             self.start_button.setText("⏹️ Dừng")
             self.start_button.setStyleSheet("""
@@ -372,6 +478,39 @@ class DashboardView(QWidget):
             print(f"Error: {e}\n{traceback.format_exc()}")
             self.stop_monitoring()
 
+    def active_detectors(self):
+        """Các detector đang giám sát (camera chính + camera phụ)"""
+        if not self.detector:
+            return []
+        return [self.detector] + [detector for detector, _, _ in self.extra_streams]
+
+    def get_camera_configs(self):
+        """
+        Cấu hình các camera cần giám sát: `camera` là camera chính, mỗi mục trong `cameras`
+        là một camera phụ (chỉ cần ghi các giá trị khác với `camera`)
+        """
+        main_camera = config.config.get("camera", {})
+        return [main_camera] + [{**main_camera, **extra} for extra in config.config.get("cameras", [])]
+
+    def create_extra_camera_label(self, stream_name):
+        label = QLabel(f"📷 {stream_name}")
+        label.setAlignment(Qt.AlignCenter)
+        label.setMinimumSize(160, 120)
+        label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+        label.setStyleSheet("""
+            QLabel {
+                background-color: #34495e;
+                border: 2px solid #2c3e50;
+                border-radius: 5px;
+                color: white;
+                font-size: 11px;
+            }
+        """)
+        label.setToolTip(stream_name)
+        label.status_overlay = StatusOverlay(label)
+        self.extra_camera_layout.addWidget(label)
+        return label
+
     def select_model_path(self):
         default_paths = [
             r"core\best.pt",
@@ -389,7 +528,7 @@ class DashboardView(QWidget):
                     return path
 
         path, _ = QFileDialog.getOpenFileName(
-            self, "Select YOLO model (best.pt)", "", "Model Files (*.pt);;All Files (*)"
+            self, "Select YOLO model (best.pt)", "", "Model Files (*.pt *.onnx);;All Files (*)"
         )
         if path and os.path.exists(path):
             return path
@@ -400,17 +539,33 @@ class DashboardView(QWidget):
     def stop_monitoring(self):
         try:
             print("🛑 Stopping...")
+            if self.metrics_sampler:
+                self.metrics_sampler.stop()
+                self.metrics_sampler = None
+
             if self.camera_thread:
                 print("📹 Stopping camera...")
                 self.camera_thread.stop()
                 self.camera_thread.wait(3000)
                 self.camera_thread = None
 
+            for detector, camera_thread, label in self.extra_streams:
+                camera_thread.stop()
+                camera_thread.wait(3000)
+                detector.stop()
+                self.extra_camera_layout.removeWidget(label)
+                label.deleteLater()
+            self.extra_streams = []
+
             if self.detector:
                 print("🔧 Stopping detector...")
                 self.detector.stop()
                 self.detector = None
 
+            if self.inference_engine:
+                self.inference_engine.stop()
+                self.inference_engine = None
+
             if hasattr(self, 'update_timer'):
                 self.update_timer.stop()
 
@@ -436,6 +591,7 @@ class DashboardView(QWidget):
             """)
             self.camera_label.setText("📷\n\nCamera đã tắt\n\nNhấn 'Bắt đầu' để khởi động")
             self.camera_label.setPixmap(QPixmap())
+            self.camera_label.status_overlay.clear()
             self.camera_label.setStyleSheet("""
                 QLabel {
                     background-color: #34495e;
@@ -446,17 +602,47 @@ class DashboardView(QWidget):
                 }
             """)
             self.status_label.setText("⚫ Đã dừng")
+            self.status_label.setToolTip("")
+            self.restart_inference_button.hide()
             self.status_label.setStyleSheet("color: #7f8c8d;")
             self.drive_time_label.setText("⏱️ 00:00:00")
             self.drowsiness_count = 0
             self.update_alert_count()
             print("✅ Stopped")
 
+    def deliver_frame(self, camera_thread, handler):
+        """Lấy frame mới nhất của camera (frame cũ hơn đã bị thay khi GUI bận) và hiển thị"""
+        item = camera_thread.take_frame()
+        if item is not None:
+            handler(*item)
+
+    def show_frame(self, label, camera_thread, pixmap, status):
+        """
+        Hiển thị frame (đã được thu nhỏ theo kích thước label ở camera thread) và cập nhật overlay trạng thái,
+        overlay chỉ vẽ lại khi status đổi
+        """
+        label.setPixmap(pixmap)
+        area = label.contentsRect()
+        camera_thread.set_display_size(area.width(), area.height())
+        # Ảnh được căn giữa trong label, overlay nằm ở góc trên bên trái của ảnh
+        label.status_overlay.set_image_rect(QRect(area.x() + (area.width() - pixmap.width()) // 2,
+                                                  area.y() + (area.height() - pixmap.height()) // 2,
+                                                  pixmap.width(), pixmap.height()))
+        label.status_overlay.set_status(status)
+        camera_thread.display_meter.tick()
+
     def update_camera_frame(self, pixmap, status):
+        paint_start = time.perf_counter()
         try:
-            scaled_pixmap = pixmap.scaled(self.camera_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.camera_label.setPixmap(scaled_pixmap)
-            if status['alert_active']:
+            if self.camera_thread:
+                self.show_frame(self.camera_label, self.camera_thread, pixmap, status)
+            self.restart_inference_button.setVisible(
+                bool(status['inference_error']) and self.detector is not None and self.detector.engine.can_restart)
+            if status['inference_error']:
+                self.status_label.setText(f"⚠️ Lỗi suy luận (khởi động lại {status['inference_restarts']} lần)")
+                self.status_label.setToolTip(status['inference_error'])
+                self.status_label.setStyleSheet("color: #e74c3c; font-weight: bold;")
+            elif status['alert_active']:
                 self.status_label.setText("🔴 CẢNH BÁO!")
                 self.status_label.setStyleSheet("color: #e74c3c; font-weight: bold;")
             else:
@@ -467,12 +653,36 @@ class DashboardView(QWidget):
                 else:
                     self.status_label.setText(f"🟢 {class_name}")
                     self.status_label.setStyleSheet("color: #27ae60; font-weight: bold;")
+            if self.detector:
+                self.detector.latency.record_since('gui_paint', paint_start)
+        except Exception as e:
+            print(f"Error updating frame: {e}")
+
+    def restart_inference(self):
+        """Khởi động lại process suy luận trong thread nền (camera và giao diện vẫn chạy)"""
+        if not self.detector:
+            return
+        self.restart_inference_button.hide()
+        self.status_label.setText("⏳ Đang khởi động lại suy luận...")
+        threading.Thread(target=self.detector.restart_inference, daemon=True).start()
+
+    def update_extra_camera_frame(self, label, camera_thread, pixmap, status):
+        """Hiển thị frame của camera phụ"""
+        paint_start = time.perf_counter()
+        try:
+            self.show_frame(label, camera_thread, pixmap, status)
+            border = "#e74c3c" if status['alert_active'] or status['class'].lower() == 'drowsy' else "#2c3e50"
+            label.setStyleSheet(f"QLabel {{ background-color: #34495e; border: 2px solid {border}; "
+                                f"border-radius: 5px; }}")
+            camera_thread.detector.latency.record_since('gui_paint', paint_start)
         except Exception as e:
             print(f"Error updating frame: {e}")
 
     def handle_drowsiness_alert(self, drowsy_ratio, confidence):
         """Xử lý cảnh báo"""
-        dialog = DrowsinessAlertDialog(self, self.detector.current_frame_id)
+        # Camera phát cảnh báo (chế độ nhiều camera), mặc định là camera chính
+        detector = getattr(self.sender(), 'detector', None) or self.detector
+        dialog = DrowsinessAlertDialog(self, detector.current_frame_id)
         result = dialog.exec_()
 
         current_time = QDateTime.currentDateTime()
@@ -482,9 +692,9 @@ class DashboardView(QWidget):
 
         if result == DrowsinessAlertDialog.Accepted:
             self.add_log(current_time.toString("HH:mm:ss"), drive_time, "✅ Buồn ngủ")
-            if self.detector:
+            if detector:
                 try:
-                    self.detector.update_alert_confirmation(
+                    detector.update_alert_confirmation(
                         dialog.crurrent_id,
                         confirmed=True,
                     )
@@ -502,9 +712,9 @@ class DashboardView(QWidget):
                 self.show_rest_alert()
         else:
             self.add_log(current_time.toString("HH:mm:ss"), drive_time, "❌ Tỉnh táo")
-            if self.detector:
+            if detector:
                 try:
-                    self.detector.update_alert_confirmation(
+                    detector.update_alert_confirmation(
                         self=dialog.current_id,
                         confirmed=False,
                     )
@@ -591,6 +801,11 @@ class DashboardView(QWidget):
         if reply == QMessageBox.Yes:
             self.log_table.setRowCount(0)
 
+    def handle_camera_info(self, info):
+        """Hiển thị định dạng camera thực tế"""
+        from utils.capture import format_capture_info
+        self.camera_label.setToolTip(f"📷 {format_capture_info(info)}")
+
     def handle_camera_error(self, error_msg):
         QMessageBox.critical(self, "Camera Error", error_msg)
         self.stop_monitoring()
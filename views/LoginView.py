@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtGui import QFont, QCursor
 from services.user_service import UserService
+from utils.model_preloader import show_model_status
 
 class LoginView(QWidget):
     """View đăng nhập"""
@@ -119,6 +120,12 @@ class LoginView(QWidget):
         register_layout.addWidget(self.register_link)
         register_layout.addStretch()
 
+        # Trạng thái nạp model nền (model được nạp trong lúc đăng nhập)
+        self.model_status_label = QLabel("")
+        self.model_status_label.setAlignment(Qt.AlignCenter)
+        self.model_status_label.setFont(QFont('Arial', 9))
+        self.model_status_label.setStyleSheet("color: #7f8c8d;")
+
         # Demo account info
         # demo_info = QLabel("💡 Đăng nhập nhanh: admin / admin")
         # demo_info.setAlignment(Qt.AlignCenter)
@@ -148,6 +155,7 @@ class LoginView(QWidget):
         form_layout.addSpacing(15)
         form_layout.addLayout(register_layout)
         form_layout.addSpacing(10)
+        form_layout.addWidget(self.model_status_label)
         # form_layout.addWidget(demo_info)
 
         layout.addWidget(login_frame)
@@ -192,6 +200,9 @@ class LoginView(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "CÓ cái lol", str(e))
 
+    def set_model_status(self, state, message):
+        show_model_status(self.model_status_label, state, message)
+
     def handle_register_click(self):
         """Xử lý khi click vào link đăng ký"""
         self.clear_form()
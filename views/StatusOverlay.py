@@ -0,0 +1,95 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QPainter, QColor, QFont, QPen
+
+import time
+
+
+class StatusOverlay(QWidget):
+    """
+    Lớp phủ trạng thái (status, confidence, drowsy ratio, thanh tiến trình cảnh báo) đặt chồng lên label camera.
+    Chỉ vẽ lại bằng QPainter khi giá trị hiển thị thay đổi, frame camera không bị vẽ chữ hay blend.
+    """
+
+    # Kích thước vùng overlay theo frame gốc 640 px, thu nhỏ theo ảnh khi ảnh hiển thị hẹp hơn
+    BASE_WIDTH, BASE_HEIGHT, REFERENCE_WIDTH = 400, 150, 640
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WA_NoSystemBackground)
+        self.scale = 1.0
+        self.latency = None  # StageLatencies của luồng, ghi thời gian vẽ vào giai đoạn 'overlay'
+        self._key = None
+        self._values = None
+        self._image_rect = None
+        self.hide()
+
+    def set_image_rect(self, rect):
+        """Đặt overlay ở góc trên bên trái vùng ảnh đang hiển thị trong label"""
+        if rect == self._image_rect:
+            return
+        self._image_rect = rect
+        self.scale = min(1.0, rect.width() / self.REFERENCE_WIDTH)
+        self.setGeometry(QRect(rect.x(), rect.y(),
+                               round(self.BASE_WIDTH * self.scale), round(self.BASE_HEIGHT * self.scale)))
+
+    def set_status(self, status):
+        """Cập nhật theo status của detector, chỉ yêu cầu vẽ lại khi nội dung hiển thị đổi"""
+        values = (status['alert_active'], status['class'], status['confidence'],
+                  status['drowsy_ratio'], status['alert_progress'])
+        # Làm tròn theo độ phân giải hiển thị (0.1% và từng pixel của thanh tiến trình)
+        key = (values[0], values[1], round(values[2] * 1000), round(values[3] * 1000), round(values[4] * 380))
+        if not self.isVisible():
+            self.show()
+        if key == self._key:
+            return False
+        self._key = key
+        self._values = values
+        self.update()
+        return True
+
+    def clear(self):
+        self._key = None
+        self._values = None
+        self._image_rect = None
+        self.hide()
+
+    def paintEvent(self, event):
+        if self._values is None:
+            return
+        paint_start = time.perf_counter()
+        alert_active, class_name, confidence, drowsy_ratio, progress = self._values
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.scale(self.scale, self.scale)
+        # Nền đen alpha 0.6 cho text
+        painter.fillRect(0, 0, self.BASE_WIDTH, self.BASE_HEIGHT, QColor(0, 0, 0, 153))
+
+        # Trạng thái hiện tại
+        painter.setFont(QFont('Arial', 15, QFont.Bold))
+        painter.setPen(QColor(255, 0, 0) if alert_active else QColor(0, 255, 0))
+        painter.drawText(10, 30, f"Status: {'DROWSY ⚠️' if alert_active else class_name}")
+
+        # Confidence
+        painter.setFont(QFont('Arial', 12, QFont.Bold))
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(10, 60, f"Confidence: {confidence * 100:.1f}%")
+
+        # Drowsy ratio
+        ratio_color = (QColor(255, 0, 0) if drowsy_ratio > 0.7 else
+                       QColor(255, 165, 0) if drowsy_ratio > 0.3 else QColor(0, 255, 0))
+        painter.setPen(ratio_color)
+        painter.drawText(10, 90, f"Drowsy Ratio: {drowsy_ratio * 100:.1f}%")
+
+        # Progress bar
+        if progress > 0:
+            painter.fillRect(10, 110, int(380 * progress), 20, QColor(255, 140, 0))
+            painter.setPen(QPen(QColor(255, 255, 255), 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRect(10, 110, 380, 20)
+        painter.end()
+
+        if self.latency is not None:
+            self.latency.record_since('overlay', paint_start)